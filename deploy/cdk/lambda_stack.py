@@ -106,9 +106,21 @@ class LambdaStack(core.Stack):
         ndjson_bucket = self._bucket(f"{construct_id}-ndjson-bucket")
         ndjson_bucket.grant_read_write(self.build_stac_lambda.role)
         ndjson_bucket.grant_read(self.submit_stac_lambda.role)
+        ndjson_bucket.grant_read_write(self.s3_discovery_lambda.role)
 
         self.build_stac_lambda.add_environment("BUCKET", ndjson_bucket.bucket_name)
         self.submit_stac_lambda.add_environment("BUCKET", ndjson_bucket.bucket_name)
+        for discovery_lambda in [self.s3_discovery_lambda, self.cmr_discovery_lambda]:
+            discovery_lambda.add_environment(
+                "MANIFEST_BUCKET", ndjson_bucket.bucket_name
+            )
+
+        # State of incremental discovery runs
+        ndjson_bucket.grant_read_write(self.cmr_discovery_lambda.role)
+        for discovery_lambda in [self.s3_discovery_lambda, self.cmr_discovery_lambda]:
+            discovery_lambda.add_environment(
+                "DISCOVERY_STATE", f"s3://{ndjson_bucket.bucket_name}/discovery-state"
+            )
 
         self.give_permissions()
 
@@ -0,0 +1,85 @@
+"""
+Benchmark event parsing, in events per second.
+
+Compares parsing the events of a batch one by one with `parse_obj`, as the
+batch handler used to, with `parse_many`:
+
+    python benchmarks/bench_events.py --events 50000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import events  # noqa: E402
+
+
+def synthetic_events(count: int, kind: str):
+    """
+    Events as written by s3-discovery (regex) or cmr-query (cmr) for one
+    collection.
+    """
+    base = {
+        "collection": "nightlights-500m-daily",
+        "id_regex": r"s3://([^/]*)/(.+).tif$",
+        "asset_name": "cog_default",
+        "asset_roles": ["data", "layer"],
+        "asset_media_type": "image/tiff; application=geotiff; profile=cloud-optimized",
+        "upload": False,
+        "cogify": False,
+    }
+    if kind == "regex":
+        return [
+            {
+                **base,
+                "s3_filename": f"s3://bucket/VNP46A2_h{i % 36:02d}_{i:06d}.tif",
+                "datetime_range": "month",
+                "properties": {"platform": "suomi-npp"},
+            }
+            for i in range(count)
+        ]
+    return [
+        {
+            **base,
+            "s3_filename": f"s3://bucket/granule_{i:06d}.tif",
+            "granule_id": f"G{i:09d}-PROVIDER",
+        }
+        for i in range(count)
+    ]
+
+
+def one_by_one(batch):
+    return [events.parse_event(event) for event in batch]
+
+
+def best_of(func, repeat, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'events':<7} {'parse_obj (ev/s)':>17} {'parse_many (ev/s)':>18}")
+    for kind in ("regex", "cmr"):
+        batch = synthetic_events(args.events, kind)
+        single_time, expected = best_of(one_by_one, args.repeat, batch)
+        bulk_time, actual = best_of(events.parse_many, args.repeat, batch)
+        assert actual == expected, kind
+        print(
+            f"{kind:<7} {args.events / single_time:>17,.0f} "
+            f"{args.events / bulk_time:>18,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
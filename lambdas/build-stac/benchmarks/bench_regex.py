@@ -0,0 +1,140 @@
+"""
+Benchmark date extraction over synthetic filenames.
+
+Compares `extract_dates` with the previous implementation, which compiled each
+date pattern and parsed every date with strptime on every call, and
+`extract_dates_many`, which matches all filenames column-wise with pyarrow,
+with calling `extract_dates` per filename. Also compares `regex_item_table`
+with `regex_item_fields` per event:
+
+    python benchmarks/bench_regex.py --filenames 50000
+"""
+import argparse
+import datetime as dt
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import events, stac  # noqa: E402
+from utils.regex import (  # noqa: E402
+    DATETIME_RANGE_METHODS,
+    extract_dates,
+    extract_dates_many,
+)
+
+
+def synthetic_filenames(count: int):
+    """
+    Daily tiles, as in nightlights-500m-daily, and monthly and date range
+    files.
+    """
+    start = dt.date(2012, 1, 1)
+    names = []
+    for i in range(count):
+        date = start + dt.timedelta(days=i % 3650)
+        kind = i % 4
+        if kind in (0, 1):
+            names.append(f"s3://bucket/VNP46A2_h{i % 36:02d}v05_{date:%Y-%m-%d}.tif")
+        elif kind == 2:
+            names.append(f"s3://bucket/OMI_trno2_0.10x0.10_{date:%Y%m}_Col3_V4.tif")
+        else:
+            end = date + dt.timedelta(days=30)
+            names.append(f"s3://bucket/no2_{date:%Y%m%d}_to_{end:%Y%m%d}.tif")
+    return names
+
+
+def legacy(filename, datetime_range):
+    strategies = [
+        (r"_(\d{4}-\d{2}-\d{2})", "%Y-%m-%d"),
+        (r"_(\d{8})", "%Y%m%d"),
+        (r"_(\d{6})", "%Y%m"),
+        (r"_(\d{4})", "%Y"),
+    ]
+    dates = []
+    for pattern, dateformat in strategies:
+        dates_found = re.compile(pattern).findall(filename)
+        if not dates_found:
+            continue
+        for date_str in dates_found:
+            date = dt.datetime.strptime(date_str, dateformat)
+            dates.append(date.replace(tzinfo=dt.timezone.utc))
+        break
+    if len(dates) > 1:
+        dates.sort()
+        return dates[0], dates[-1], None
+    if datetime_range:
+        return (*DATETIME_RANGE_METHODS[datetime_range](dates[0]), None)
+    return None, None, dates[0]
+
+
+def run(func, filenames, datetime_range):
+    return [func(filename, datetime_range) for filename in filenames]
+
+
+def run_fields(items):
+    return [stac.regex_item_fields(item) for item in items]
+
+
+def best_of(func, repeat, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filenames", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    filenames = synthetic_filenames(args.filenames)
+
+    print(
+        f"{'range':<8} {'legacy (s)':>11} {'compiled (s)':>13} {'batch (s)':>10} "
+        f"{'us/file':>9}"
+    )
+    for datetime_range in (None, "month", "year"):
+        legacy_time, expected = best_of(
+            run, args.repeat, legacy, filenames, datetime_range
+        )
+        compiled_time, actual = best_of(
+            run, args.repeat, extract_dates, filenames, datetime_range
+        )
+        assert actual == expected, datetime_range
+        batch_time, actual = best_of(
+            extract_dates_many, args.repeat, filenames, datetime_range
+        )
+        assert actual == expected, datetime_range
+        per_file = (compiled_time - batch_time) / args.filenames * 1e6
+        print(
+            f"{str(datetime_range):<8} {legacy_time:>11.3f} {compiled_time:>13.3f} "
+            f"{batch_time:>10.3f} {per_file:>+9.2f}"
+        )
+
+    items = [
+        events.RegexEvent.parse_obj(
+            {
+                "collection": "bench",
+                "s3_filename": filename,
+                "id_regex": r"s3://([^/]*)/(.+).tif$" if i % 2 else None,
+            }
+        )
+        for i, filename in enumerate(filenames)
+    ]
+    fields_time, expected = best_of(run_fields, args.repeat, items)
+    table_time, actual = best_of(stac.regex_item_table, args.repeat, items)
+    assert actual == expected
+    print(
+        f"{'fields':<8} per event {fields_time:.3f}s, table {table_time:.3f}s, "
+        f"{(fields_time - table_time) / args.filenames * 1e6:+.2f} us/event"
+    )
+
+
+if __name__ == "__main__":
+    main()
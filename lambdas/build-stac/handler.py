@@ -1,13 +1,19 @@
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from sys import getsizeof
-from typing import Any, Dict, TypedDict, Union
+from typing import Any, Dict, List, TypedDict, Union
 from uuid import uuid4
 
 import smart_open
 
 from utils import stac, events
 
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", 8))
+# Kept across invocations, with the GDAL environment of each of its threads
+# (see utils.gdal)
+executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS)
+
 
 class S3LinkOutput(TypedDict):
     stac_file_url: str
@@ -17,6 +23,12 @@ class StacItemOutput(TypedDict):
     stac_item: Dict[str, Any]
 
 
+class BatchOutput(TypedDict):
+    stac_items_file_url: str
+    count: int
+    failures: List[Dict[str, Any]]
+
+
 def handler(event: Dict[str, Any], context) -> Union[S3LinkOutput, StacItemOutput]:
     """
     Lambda handler for STAC Collection Item generation
@@ -37,8 +49,7 @@ def handler(event: Dict[str, Any], context) -> Union[S3LinkOutput, StacItemOutpu
 
     """
 
-    EventType = events.CmrEvent if event.get("granule_id") else events.RegexEvent
-    parsed_event = EventType.parse_obj(event)
+    parsed_event = events.parse_event(event)
     stac_item = stac.generate_stac(parsed_event).to_dict()
 
     output: StacItemOutput = {"stac_item": stac_item}
@@ -55,6 +66,95 @@ def handler(event: Dict[str, Any], context) -> Union[S3LinkOutput, StacItemOutpu
     return {"stac_file_url": key}
 
 
+def read_batch(event: Union[List, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Events of a batch: a list, a list under "objects", or the lines of the NDJSON
+    manifests (as written by the discovery lambdas) under "manifests".
+    """
+    if isinstance(event, list):
+        return event
+    if "manifests" in event:
+        batch = []
+        for manifest in event["manifests"]:
+            url = manifest["manifest"] if isinstance(manifest, dict) else manifest
+            with smart_open.open(url) as f:
+                batch.extend(json.loads(line) for line in f if line.strip())
+        return batch
+    return event["objects"]
+
+
+def batch_handler(event: Union[List, Dict[str, Any]], context) -> BatchOutput:
+    """
+    Generate the STAC items of a batch of events in one invocation.
+
+    Items are generated concurrently in `BATCH_WORKERS` threads, as reading COG
+    headers is I/O bound, and written to S3 as NDJSON, one item per line. CMR
+    records of the batch are fetched up front in as few requests as possible.
+    An event that fails is reported in `failures` and does not stop the rest
+    of the batch.
+    """
+    batch = read_batch(event)
+
+    parsed, failures = [], []
+    for item_event, item in zip(batch, events.parse_many(batch)):
+        if isinstance(item, Exception):
+            failures.append({**item_event, "error": str(item)})
+        else:
+            parsed.append((item_event, item))
+
+    granule_ids = [
+        item.granule_id
+        for _, item in parsed
+        if isinstance(item, events.CmrEvent) and not item.cmr_metadata
+    ]
+    if granule_ids:
+        try:
+            stac.cmr_client.get_many(granule_ids)
+        except Exception as e:
+            # Items fall back to fetching their own record
+            print(f"Failed to prefetch CMR records: {e}")
+
+    items = []
+    # Ids and datetimes of regex events are derived column-wise for the whole
+    # batch, and events without them fail before items are generated
+    regex_parsed = [
+        (item_event, item)
+        for item_event, item in parsed
+        if isinstance(item, events.RegexEvent)
+    ]
+    table = stac.regex_item_table([item for _, item in regex_parsed])
+    rows = iter(table)
+
+    futures = []
+    for item_event, item in parsed:
+        # Rows are in the order of regex_parsed, which follows parsed
+        row = next(rows) if isinstance(item, events.RegexEvent) else None
+        if isinstance(row, Exception):
+            failures.append({**item_event, "error": str(row)})
+        elif row is not None:
+            futures.append(
+                (item_event, executor.submit(stac.generate_stac, item, fields=row))
+            )
+        else:
+            futures.append((item_event, executor.submit(stac.generate_stac, item)))
+    for item_event, future in futures:
+        try:
+            items.append(future.result().to_dict())
+        except Exception as e:
+            failures.append({**item_event, "error": str(e)})
+
+    key = f"s3://{os.environ['BUCKET']}/{uuid4()}.ndjson"
+    with smart_open.open(key, "w") as file:
+        for stac_item in items:
+            file.write(json.dumps(stac_item) + "\n")
+
+    print(
+        f"Generated {len(items)} items, {len(failures)} failed, "
+        f"CMR cache {stac.cmr_client.stats()}"
+    )
+    return {"stac_items_file_url": key, "count": len(items), "failures": failures}
+
+
 if __name__ == "__main__":
     sample_event = {
         "collection": "nightlights-hd-monthly",
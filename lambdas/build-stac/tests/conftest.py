@@ -22,6 +22,8 @@ def aws_credentials():
     os.environ["AWS_SECURITY_TOKEN"] = "testing"
     os.environ["AWS_SESSION_TOKEN"] = "testing"
     os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    # moto stores aws-chunked uploads (with trailing checksums) verbatim
+    os.environ["AWS_REQUEST_CHECKSUM_CALCULATION"] = "when_required"
 
 
 @pytest.fixture
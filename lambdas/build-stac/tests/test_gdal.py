@@ -0,0 +1,72 @@
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+import rasterio
+
+from utils import gdal
+
+
+@pytest.fixture(autouse=True)
+def thread_env():
+    yield
+    env = getattr(gdal._local, "env", None)
+    if env is not None:
+        env.__exit__()
+        del gdal._local.env
+
+
+def test_env_is_reused():
+    """
+    Ensure a thread enters its environment once, and again when the profile
+    changes.
+    """
+    env = gdal.ensure_env("cog")
+    assert gdal.ensure_env("cog") is env
+    assert rasterio.env.getenv()["GDAL_DISABLE_READDIR_ON_OPEN"] == "EMPTY_DIR"
+
+    default_env = gdal.ensure_env("default")
+    assert default_env is not env
+    assert rasterio.env.getenv()["GDAL_DISABLE_READDIR_ON_OPEN"] == "FALSE"
+
+
+def test_env_per_thread():
+    envs = []
+    thread = threading.Thread(target=lambda: envs.append(gdal.ensure_env("cog")))
+    thread.start()
+    thread.join()
+    assert envs[0] is not gdal.ensure_env("cog")
+
+
+def test_env_follows_credentials():
+    """
+    Ensure the environment is entered again when the external role's
+    credentials are refreshed.
+    """
+    keys = iter(["key-1", "key-1", "key-2"])
+
+    def session_kwargs(role_arn, session_name):
+        return {
+            "aws_access_key_id": next(keys),
+            "aws_secret_access_key": "secret",
+            "aws_session_token": "token",
+        }
+
+    with patch.dict(os.environ, {"EXTERNAL_ROLE_ARN": "arn:role"}), patch.object(
+        gdal.role, "session_kwargs", session_kwargs
+    ):
+        env = gdal.ensure_env("default")
+        assert gdal.ensure_env("default") is env
+        assert gdal.ensure_env("default") is not env
+        assert rasterio.env.getenv()["AWS_ACCESS_KEY_ID"] == "key-2"
+
+
+def test_gdal_options_environment_override():
+    with patch.dict(os.environ, {"VSI_CACHE_SIZE": "1000"}):
+        options = gdal.gdal_options("cog")
+    assert "VSI_CACHE_SIZE" not in options
+    assert options["GDAL_HTTP_MULTIPLEX"] == "YES"
+
+    with pytest.raises(ValueError):
+        gdal.gdal_options("unknown")
@@ -1,6 +1,7 @@
 import contextlib
+import json
 from typing import TYPE_CHECKING, Any, Dict, Type
-from unittest.mock import MagicMock, Mock
+from unittest.mock import MagicMock, Mock, patch
 from pydantic import ValidationError
 
 import pytest
@@ -100,3 +101,126 @@ def test_routing_unexpected_event(bad_event):
     """
     with pytest.raises(ValidationError):
         handler.handler(bad_event, None)
+
+
+def test_batch_handler(s3_created_bucket):
+    """
+    Ensure that a batch writes the items it generates as NDJSON and reports the
+    events that failed without stopping the batch.
+    """
+    regex_events = [
+        {
+            "collection": "test-collection",
+            "s3_filename": f"s3://test-bucket/delivery/file_{i}_2017-07-21.tif",
+        }
+        for i in range(3)
+    ]
+    bad_event = {"collection": "test-collection"}
+
+    def generate(item, fields):
+        if item.s3_filename.endswith("file_1_2017-07-21.tif"):
+            raise ValueError("Unreadable file")
+        assert fields["id"] == item.item_id()
+        return build_mock_stac_item({"id": item.s3_filename})
+
+    with override_registry(
+        stac.generate_stac, events.RegexEvent, MagicMock(side_effect=generate)
+    ):
+        output = handler.batch_handler({"objects": regex_events + [bad_event]}, None)
+
+    assert output["count"] == 2
+    assert [failure["error"] for failure in output["failures"]][-1] == (
+        "Unreadable file"
+    )
+    assert len(output["failures"]) == 2
+    key = output["stac_items_file_url"].replace("s3://test-bucket/", "")
+    lines = s3_created_bucket.Object(key).get()["Body"].read().decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [
+        regex_events[0]["s3_filename"],
+        regex_events[2]["s3_filename"],
+    ]
+
+
+def test_batch_handler_mixed_events(s3_created_bucket):
+    """
+    Ensure that each regex event gets its own row when regex and CMR events are
+    interleaved.
+    """
+    batch = []
+    for i in range(3):
+        batch.append(
+            {
+                "collection": "test-collection",
+                "s3_filename": f"s3://test-bucket/cmr_{i}.tif",
+                "granule_id": f"G{i}",
+                "cmr_metadata": {"time_start": "2017-07-21T00:00:00Z"},
+            }
+        )
+        batch.append(
+            {
+                "collection": "test-collection",
+                "s3_filename": f"s3://test-bucket/file_{i}_2017-07-2{i}.tif",
+            }
+        )
+
+    def generate(item, fields):
+        assert fields["cog_url"] == item.s3_filename
+        assert fields["datetime"].day == 20 + int(item.s3_filename[-16])
+        return build_mock_stac_item({"id": fields["id"]})
+
+    with override_registry(
+        stac.generate_stac, events.RegexEvent, MagicMock(side_effect=generate)
+    ), override_registry(
+        stac.generate_stac,
+        events.CmrEvent,
+        MagicMock(
+            side_effect=lambda item: build_mock_stac_item({"id": item.item_id()})
+        ),
+    ):
+        output = handler.batch_handler({"objects": batch}, None)
+
+    assert output["failures"] == []
+    key = output["stac_items_file_url"].replace("s3://test-bucket/", "")
+    lines = s3_created_bucket.Object(key).get()["Body"].read().decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [
+        "cmr_0",
+        "file_0_2017-07-20",
+        "cmr_1",
+        "file_1_2017-07-21",
+        "cmr_2",
+        "file_2_2017-07-22",
+    ]
+
+
+def test_batch_handler_manifests(s3_created_bucket):
+    """
+    Ensure that a batch reads its events from NDJSON manifests and fetches the
+    CMR records of the whole batch at once.
+    """
+    cmr_events = [
+        {
+            "collection": "test-collection",
+            "s3_filename": f"s3://test-bucket/file_{i}.tif",
+            "granule_id": f"G{i}",
+        }
+        for i in range(3)
+    ]
+    s3_created_bucket.put_object(
+        Key="manifests/0.ndjson",
+        Body="".join(json.dumps(e) + "\n" for e in cmr_events),
+    )
+
+    with override_registry(
+        stac.generate_stac,
+        events.CmrEvent,
+        MagicMock(return_value=build_mock_stac_item({"mock": "STAC Item"})),
+    ) as generate, patch.object(stac, "cmr_client") as cmr_client:
+        output = handler.batch_handler(
+            {"manifests": [{"manifest": "s3://test-bucket/manifests/0.ndjson"}]},
+            None,
+        )
+
+    cmr_client.get_many.assert_called_once_with(["G0", "G1", "G2"])
+    assert generate.call_count == 3
+    assert output["count"] == 3
+    assert output["failures"] == []
@@ -0,0 +1,127 @@
+from datetime import datetime
+
+import numpy
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from utils import raster, stac
+
+STATISTICS = {
+    "STATISTICS_MINIMUM": "1",
+    "STATISTICS_MAXIMUM": "8",
+    "STATISTICS_MEAN": "4.5",
+    "STATISTICS_STDDEV": "2.29",
+}
+
+
+def write_cog(path, tags=None):
+    """
+    A tiled 512x512 GeoTIFF with 2x and 4x overviews, whose full resolution
+    pixels are 0 in one corner and 1 to 8 elsewhere.
+    """
+    data = numpy.tile(numpy.arange(1, 9, dtype="uint8"), (512, 64))
+    data[:2, :2] = 0
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        width=512,
+        height=512,
+        count=1,
+        dtype="uint8",
+        nodata=0,
+        crs="EPSG:4326",
+        transform=from_origin(-10, 10, 0.01, 0.01),
+        tiled=True,
+        blockxsize=256,
+        blockysize=256,
+    ) as dst:
+        dst.write(data, 1)
+        dst.build_overviews([2, 4])
+        if tags:
+            dst.update_tags(1, **tags)
+    return str(path)
+
+
+@pytest.fixture
+def cog(tmp_path):
+    return write_cog(tmp_path / "cog.tif")
+
+
+@pytest.fixture
+def cog_with_statistics(tmp_path):
+    return write_cog(tmp_path / "cog_stats.tif", STATISTICS)
+
+
+def test_smallest_overview_size(cog):
+    with rasterio.open(cog) as src:
+        assert raster.smallest_overview_size(src) == 128
+
+
+def test_header_mode_uses_embedded_statistics(cog_with_statistics):
+    """
+    Ensure header mode takes statistics from the GDAL metadata without reading
+    pixels.
+    """
+    with rasterio.open(cog_with_statistics) as src:
+        src.read = None
+        (band,) = raster.get_raster_bands(src, "header")
+
+    assert band["statistics"] == {
+        "minimum": 1.0,
+        "maximum": 8.0,
+        "mean": 4.5,
+        "stddev": 2.29,
+    }
+    assert band["data_type"] == "uint8"
+    assert band["nodata"] == 0
+    assert "histogram" not in band
+
+
+@pytest.mark.parametrize("mode", ["overview", "header"])
+def test_overview_statistics(cog, mode):
+    """
+    Ensure statistics come from the smallest overview when the file has none
+    embedded.
+    """
+    with rasterio.open(cog) as src:
+        (band,) = raster.get_raster_bands(src, mode)
+        (full,) = raster.get_raster_bands(src, "full")
+
+    assert band["statistics"]["minimum"] == 1
+    assert band["statistics"]["maximum"] == 5
+    assert band["histogram"]["count"] == 11
+    assert band.keys() == full.keys()
+
+
+def test_unknown_mode(cog):
+    with rasterio.open(cog) as src, pytest.raises(ValueError):
+        raster.get_raster_bands(src, "pixels")
+
+
+def test_create_item_header_mode(cog_with_statistics):
+    """
+    Ensure the fast path builds the same item as rio_stac, apart from the
+    statistics.
+    """
+    kwargs = dict(
+        id="cog",
+        properties={},
+        datetime=datetime(2022, 1, 20),
+        cog_url=cog_with_statistics,
+        collection="test-collection",
+    )
+    full = stac.create_item(**kwargs, raster_metadata="full").to_dict()
+    fast = stac.create_item(**kwargs, raster_metadata="header").to_dict()
+
+    assert fast["geometry"] == full["geometry"]
+    assert fast["bbox"] == full["bbox"]
+    assert fast["stac_extensions"] == full["stac_extensions"]
+    assert fast["properties"] == full["properties"]
+    fast_asset, full_asset = (
+        fast["assets"]["cog_default"],
+        full["assets"]["cog_default"],
+    )
+    assert fast_asset["href"] == full_asset["href"] == cog_with_statistics
+    assert fast_asset["raster:bands"][0]["statistics"]["mean"] == 4.5
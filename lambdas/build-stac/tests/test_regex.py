@@ -1,6 +1,8 @@
 import pytest
+from pydantic import ValidationError
 
 from datetime import datetime, timezone
+from pathlib import Path
 
 from utils import regex, events
 
@@ -136,6 +138,88 @@ def test_date_extraction(test_input, expected):
     assert regex.extract_dates(*test_input) == expected
 
 
+@pytest.mark.parametrize(
+    "test_input,expected",
+    [
+        (
+            # Dates of the preferred format win, wherever they are
+            ("s3://foo/bar/foo_2012_bar_20051212.tif", None),
+            (None, None, datetime(2005, 12, 12).replace(tzinfo=timezone.utc)),
+        ),
+        (
+            # Dates of other formats are ignored
+            ("s3://foo/2012_bar/foo_200501_bar_2003-03-03_2004-04-04.tif", None),
+            (
+                datetime(2003, 3, 3).replace(tzinfo=timezone.utc),
+                datetime(2004, 4, 4).replace(tzinfo=timezone.utc),
+                None,
+            ),
+        ),
+    ],
+)
+def test_date_format_preference(test_input, expected):
+    assert regex.extract_dates(*test_input) == expected
+
+
+@pytest.mark.parametrize(
+    "filename", ["s3://foo/bar/foo_bar.tif", "s3://foo/bar/foo_2005-13-45.tif"]
+)
+def test_date_extraction_errors(filename):
+    with pytest.raises(Exception):
+        regex.extract_dates(filename, None)
+
+
+@pytest.mark.parametrize("datetime_range", [None, "month", "year"])
+def test_extract_dates_many(datetime_range):
+    """
+    Ensure dates extracted column-wise match those of each filename, and that
+    a filename whose dates can't be extracted only fails its own entry.
+    """
+    filenames = [
+        "s3://foo/bar/foo_2010-10-31_bar.tif",
+        "s3://foo/bar/foo_2010-10-31_bar.tif",
+        "s3://foo/bar/foo_bar.tif",
+        "s3://foo/bar/foo_2012_bar_20051212.tif",
+        "s3://foo/2012_bar/foo_200501_bar_2003-03-03_2004-04-04.tif",
+        "s3://foo/bar/foo_2004_2001_2003.tif",
+        "s3://foo/bar/foo_2005-13-45.tif",
+        "s3://foo/bar/foo_2005-01-01_2005-13-45_2004-01-01.tif",
+        "s3://foo/bar/foo_202001_bar.tif",
+        "s3://foo/bar\n_2005",
+        "",
+    ]
+
+    dates = regex.extract_dates_many(filenames, datetime_range)
+
+    assert len(dates) == len(filenames)
+    for filename, extracted in zip(filenames, dates):
+        try:
+            expected = regex.extract_dates(filename, datetime_range)
+        except Exception as e:
+            assert type(extracted) is type(e)
+            assert str(extracted) == str(e)
+        else:
+            assert extracted == expected
+    assert regex.extract_dates_many([], datetime_range) == []
+
+
+def test_filename_stems():
+    filenames = [
+        "s3://foo/bar/foo_2010-10-31_bar.tif",
+        "s3://foo/bar/foo.tar.gz",
+        "s3://foo/bar/.hidden",
+        "s3://foo/bar/foo.",
+        "s3://foo/bar/",
+        "s3://foo/bar/.",
+        "s3://foo",
+        "foo.tif",
+        "",
+    ]
+    assert regex.filename_stems(filenames) == [
+        Path(filename).stem for filename in filenames
+    ]
+
+
 @pytest.mark.parametrize(
     "input,expected",
     [
@@ -166,3 +250,43 @@ def test_item_id_regex(input, expected):
     Ensure dateranges are properly extracted from filenames.
     """
     assert input.item_id() == expected
+
+
+def test_parse_many():
+    """
+    Ensure events parsed in bulk equal events parsed one by one, and that
+    invalid events only fail their own entry.
+    """
+    batch = [
+        {
+            "collection": "NO2",
+            "s3_filename": f"s3://OMNO2d_HRM/OMI_trno20.10x0.10_2016{i:02d}.tif",
+            "id_regex": r"s3://([^/]*)/(.+).tif$",
+            "asset_media_type": "image/tiff",
+            "upload": True,
+        }
+        for i in range(1, 4)
+    ] + [
+        {"collection": "NO2", "id_regex": r"s3://([^/]*)/(.+).tif$"},
+        {"collection": "NO2", "s3_filename": "s3://a/b.tif", "id_regex": "(["},
+        {
+            "collection": "NO2",
+            "s3_filename": "s3://a/G1.tif",
+            "granule_id": "G1",
+            "cmr_metadata": {"time_start": "2016-01-01T00:00:00Z"},
+        },
+        {"collection": "NO2", "s3_filename": "s3://a/G2.tif", "granule_id": "G2"},
+        {"collection": "NO2", "s3_filename": 2, "granule_id": "G3"},
+    ]
+
+    parsed = events.parse_many(batch)
+
+    for i in (0, 1, 2, 5, 6):
+        assert parsed[i] == events.parse_event(batch[i])
+        assert type(parsed[i]) is type(events.parse_event(batch[i]))
+    assert parsed[6].cmr_metadata is None
+    assert parsed[2].item_id() == "OMNO2d_HRM-OMI_trno20.10x0.10_201603"
+    assert isinstance(parsed[3], ValidationError)
+    assert isinstance(parsed[4], ValidationError)
+    # Coerced like parse_obj does
+    assert parsed[7].s3_filename == "2"
@@ -0,0 +1,80 @@
+import datetime as dt
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from utils import role
+
+
+@pytest.fixture
+def sts():
+    """
+    STS client whose credentials expire `sts.lifetime` after they are assumed.
+    """
+    client = MagicMock()
+    client.lifetime = dt.timedelta(hours=1)
+
+    def assume_role(RoleArn, RoleSessionName):
+        return {
+            "Credentials": {
+                "AccessKeyId": f"key-{client.assume_role.call_count}",
+                "SecretAccessKey": "secret",
+                "SessionToken": "token",
+                "Expiration": dt.datetime.now(dt.timezone.utc) + client.lifetime,
+            }
+        }
+
+    client.assume_role.side_effect = assume_role
+    with patch.object(role.boto3, "client", return_value=client):
+        yield client
+
+
+def test_credentials_are_cached(sts):
+    """
+    Ensure a role is assumed once per (role_arn, session_name).
+    """
+    cache = role.CredentialCache()
+
+    first = cache.get("arn:role", "session")
+    assert cache.get("arn:role", "session") is first
+    assert sts.assume_role.call_count == 1
+
+    cache.get("arn:role", "other-session")
+    cache.get("arn:other-role", "session")
+    assert sts.assume_role.call_count == 3
+
+
+def test_expiring_credentials_are_refreshed(sts):
+    """
+    Ensure credentials close to expiring are assumed again, in the background
+    until they are within the refresh margin.
+    """
+    cache = role.CredentialCache(
+        refresh_margin=dt.timedelta(minutes=5),
+        background_refresh=dt.timedelta(minutes=15),
+    )
+
+    sts.lifetime = dt.timedelta(minutes=10)
+    first = cache.get("arn:role", "session")
+    sts.lifetime = dt.timedelta(hours=1)
+    # Still valid, returned while a thread refreshes them
+    assert cache.get("arn:role", "session") is first
+    for thread in list(role.threading.enumerate()):
+        if thread.name != "MainThread":
+            thread.join(timeout=1)
+    assert sts.assume_role.call_count == 2
+    assert cache.get("arn:role", "session")["AccessKeyId"] == "key-2"
+
+    sts.lifetime = dt.timedelta(minutes=1)
+    cache.clear()
+    cache.get("arn:role", "session")
+    assert cache.get("arn:role", "session")["AccessKeyId"] == "key-4"
+
+
+def test_session_kwargs(sts):
+    with patch.object(role, "credentials", role.CredentialCache()):
+        assert role.session_kwargs("arn:role", "session") == {
+            "aws_access_key_id": "key-1",
+            "aws_secret_access_key": "secret",
+            "aws_session_token": "token",
+        }
@@ -0,0 +1,193 @@
+import time
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from utils import events, stac
+
+CMR_EVENT = {
+    "collection": "test-collection",
+    "s3_filename": "s3://test-bucket/OMI-Aura_L3-OMDOAO3e_2022m0120_v003.tif",
+    "granule_id": "G0000-TEST",
+}
+CMR_JSON = {
+    "id": "G0000-TEST",
+    "time_start": "2022-01-20T00:00:00.000Z",
+    "time_end": "2022-01-20T23:59:59.999Z",
+}
+
+
+@pytest.fixture(autouse=True)
+def cmr_client():
+    with patch.object(stac, "cmr_client", stac.CmrMetadataClient()) as client:
+        yield client
+
+
+@pytest.fixture
+def granule_query():
+    """
+    CMR searches by concept id, recording the ids of each request.
+    """
+    requests = []
+
+    def concept_id(ids):
+        requests.append(list(ids))
+        query = MagicMock()
+        query.get.return_value = [
+            {**CMR_JSON, "id": granule_id} for granule_id in ids if granule_id != "G404"
+        ]
+        return query
+
+    with patch.object(stac, "GranuleQuery") as query:
+        query.return_value.concept_id.side_effect = concept_id
+        yield requests
+
+
+def test_cmr_client_batches(granule_query):
+    """
+    Ensure missing records are fetched in batches and then served from cache.
+    """
+    client = stac.CmrMetadataClient(batch_size=2)
+    ids = ["G1", "G2", "G3", "G1"]
+
+    records = client.get_many(ids)
+    assert set(records) == {"G1", "G2", "G3"}
+    assert granule_query == [["G1", "G2"], ["G3"]]
+
+    assert client.get_many(["G2", "G3"]).keys() == {"G2", "G3"}
+    assert client.get("G1")["id"] == "G1"
+    assert len(granule_query) == 2
+    assert client.stats() == {"hits": 3, "misses": 3, "size": 3}
+
+    with pytest.raises(KeyError):
+        client.get("G404")
+
+
+def test_cmr_client_lru_and_ttl(granule_query):
+    client = stac.CmrMetadataClient(maxsize=2)
+    client.get_many(["G1", "G2"])
+    client.get("G1")
+    client.get("G3")
+    # G2 was least recently used
+    client.get_many(["G1", "G2"])
+    assert granule_query[-1] == ["G2"]
+
+    with patch.object(stac.time, "monotonic", return_value=time.monotonic() + 7200):
+        client.get("G2")
+    assert granule_query[-1] == ["G2"]
+    assert len(granule_query) == 4
+
+
+@pytest.mark.parametrize(
+    "cmr_metadata,queried",
+    [(CMR_JSON, False), (None, True), ({"id": "G0000-TEST"}, True)],
+)
+def test_generate_stac_cmrevent(cmr_metadata, queried):
+    """
+    Ensure CMR is only queried when discovery didn't pass the granule's
+    metadata on.
+    """
+    event = events.CmrEvent.parse_obj({**CMR_EVENT, "cmr_metadata": cmr_metadata})
+
+    with patch.object(stac, "GranuleQuery") as query, patch.object(
+        stac, "create_item"
+    ) as create_item:
+        query.return_value.concept_id.return_value.get.return_value = [CMR_JSON]
+        stac.generate_stac(event)
+
+    assert query.called == queried
+    assert create_item.call_args.kwargs["properties"] == CMR_JSON
+    assert (
+        create_item.call_args.kwargs["datetime"]
+        .isoformat()
+        .startswith("2022-01-20T00:00:00")
+    )
+
+
+def test_regex_item_table():
+    """
+    Ensure the fields derived for a batch hold each event's id and dates, and
+    that an event without dates only fails its own row.
+    """
+    items = [
+        events.RegexEvent.parse_obj(
+            {
+                "collection": "test-collection",
+                "s3_filename": filename,
+                "datetime_range": datetime_range,
+                "properties": {"source": "test"},
+            }
+        )
+        for filename, datetime_range in [
+            ("s3://test-bucket/VNP46A2_2022-01-20.tif", None),
+            ("s3://test-bucket/no2_202201.tif", "month"),
+            ("s3://test-bucket/no2_20220101_to_20220131.tif", None),
+            ("s3://test-bucket/no-date.tif", None),
+            ("s3://test-bucket/VNP46A2_2022-01-21.tif", "year"),
+        ]
+    ]
+
+    table = stac.regex_item_table(items)
+
+    assert isinstance(table[3], Exception)
+    assert [row["id"] for i, row in enumerate(table) if i != 3] == [
+        "VNP46A2_2022-01-20",
+        "no2_202201",
+        "no2_20220101_to_20220131",
+        "VNP46A2_2022-01-21",
+    ]
+    assert table[0]["datetime"] == datetime(2022, 1, 20, tzinfo=timezone.utc)
+    assert table[0]["properties"] == {"source": "test"}
+    assert table[1]["datetime"] is None
+    assert table[1]["properties"] == {
+        "source": "test",
+        "start_datetime": "2022-01-01T00:00:00Z",
+        "end_datetime": "2022-01-31T00:00:00Z",
+    }
+    assert table[2]["properties"]["end_datetime"] == "2022-01-31T00:00:00Z"
+    assert table[4]["properties"]["start_datetime"] == "2022-01-01T00:00:00Z"
+    assert table[4]["properties"]["end_datetime"] == "2022-12-31T00:00:00Z"
+    assert table[0]["cog_url"] == "s3://test-bucket/VNP46A2_2022-01-20.tif"
+    assert items[1].properties == {"source": "test"}
+    # Derived column-wise, rows still match the fields of each event
+    for i, (item, row) in enumerate(zip(items, table)):
+        if i != 3:
+            assert row == stac.regex_item_fields(item)
+
+
+def test_regex_item_table_ids():
+    """
+    Ensure ids derived for a batch match those of each event, whatever its
+    id_regex, and that an id_regex that doesn't match only fails its own row.
+    """
+    items = [
+        events.RegexEvent.parse_obj(
+            {
+                "collection": "test-collection",
+                "s3_filename": filename,
+                "id_regex": id_regex,
+            }
+        )
+        for filename, id_regex in [
+            ("s3://test-bucket/OMI_trno2_2022-01-20.tif", r"s3://([^/]*)/(.+).tif$"),
+            ("s3://test-bucket/VNP46A2_2022-01-20.tif", None),
+            ("s3://other-bucket/OMI_trno2_2022-01-21.tif", r"s3://([^/]*)/(.+).tif$"),
+            ("s3://test-bucket/VNP46A2_2022-01-21.tif", r".*_(\d{4})-(\d{2})"),
+            ("s3://test-bucket/VNP46A2_2022-01-22.tif", r"_h(\d{2})v(\d{2})"),
+        ]
+    ]
+
+    table = stac.regex_item_table(items)
+
+    assert [row["id"] for row in table[:4]] == [
+        "test-bucket-OMI_trno2_2022-01-20",
+        "VNP46A2_2022-01-20",
+        "other-bucket-OMI_trno2_2022-01-21",
+        "2022-01",
+    ]
+    for item, row in zip(items[:4], table):
+        assert row["id"] == item.item_id()
+    assert isinstance(table[4], AssertionError)
+    with pytest.raises(AssertionError):
+        items[4].item_id()
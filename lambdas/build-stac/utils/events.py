@@ -1,13 +1,18 @@
 from datetime import datetime
-from typing import Dict, List, Literal, Optional, Union
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Literal, Optional, Type, Union
 from pathlib import Path
 import re
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
 import pystac
 
 
 INTERVAL = Literal["month", "year"]
+RASTER_METADATA = Literal["full", "overview", "header"]
+
+# id_regex is usually the same for every event of a collection
+compile_regex = lru_cache(maxsize=256)(re.compile)
 
 
 class BaseEvent(BaseModel, frozen=True):
@@ -18,10 +23,21 @@ class BaseEvent(BaseModel, frozen=True):
     asset_name: Optional[str] = None
     asset_roles: Optional[List[str]] = None
     asset_media_type: Optional[Union[str, pystac.MediaType]] = None
+    # How band statistics are computed, see utils.raster
+    raster_metadata: Optional[RASTER_METADATA] = None
+
+    @validator("id_regex")
+    def id_regex_compiles(cls, id_regex: Optional[str]) -> Optional[str]:
+        if id_regex:
+            try:
+                compile_regex(id_regex)
+            except re.error as e:
+                raise ValueError(f"Invalid id_regex {id_regex}: {e}")
+        return id_regex
 
     def item_id(self: "BaseEvent") -> str:
         if self.id_regex:
-            id_components = re.findall(self.id_regex, self.s3_filename)
+            id_components = compile_regex(self.id_regex).findall(self.s3_filename)
             assert len(id_components) == 1
             id = "-".join(id_components[0])
         else:
@@ -31,6 +47,8 @@ class BaseEvent(BaseModel, frozen=True):
 
 class CmrEvent(BaseEvent):
     granule_id: str
+    # CMR record of the granule, when discovery passed it on
+    cmr_metadata: Optional[Dict] = None
 
 
 class RegexEvent(BaseEvent):
@@ -45,3 +63,76 @@ class RegexEvent(BaseEvent):
 
 
 SupportedEvent = Union[RegexEvent, CmrEvent]
+
+
+# Fields that differ between the events of a batch, and their types
+PER_ITEM_FIELDS = {
+    "s3_filename": (str,),
+    "granule_id": (str,),
+    "cmr_metadata": (dict, type(None)),
+}
+
+
+def event_type(event: Dict[str, Any]) -> Type[BaseEvent]:
+    return CmrEvent if event.get("granule_id") else RegexEvent
+
+
+def parse_event(event: Dict[str, Any]) -> SupportedEvent:
+    return event_type(event).parse_obj(event)
+
+
+@lru_cache(maxsize=None)
+def _batch_fields(EventType: Type[BaseEvent]) -> tuple:
+    per_item = tuple(name for name in PER_ITEM_FIELDS if name in EventType.__fields__)
+    shared = tuple(name for name in EventType.__fields__ if name not in per_item)
+    required = frozenset(
+        name for name in per_item if EventType.__fields__[name].required
+    )
+    # Optional fields missing from an event must not be taken from the copy
+    defaults = {
+        name: EventType.__fields__[name].default
+        for name in per_item
+        if name not in required
+    }
+    return per_item, shared, required, defaults
+
+
+def parse_many(
+    events: Iterable[Dict[str, Any]]
+) -> List[Union[SupportedEvent, Exception]]:
+    """
+    Parse the events of a batch, which usually only differ by their file and
+    granule. The other fields are validated once per distinct value, and
+    events that share them are copies of the first one with their own file and
+    granule, whose types are checked directly. An event that fails validation
+    is replaced by its exception.
+    """
+    validated: Dict[tuple, BaseEvent] = {}
+    parsed = []
+    for event in events:
+        try:
+            EventType = event_type(event)
+            per_item_fields, shared_fields, required, defaults = _batch_fields(
+                EventType
+            )
+            per_item = {name: event[name] for name in per_item_fields if name in event}
+            shared = {name: event[name] for name in shared_fields if name in event}
+            # Fields are always in the same order, and the repr of JSON values
+            # is unambiguous
+            key = (EventType, repr(shared))
+            template = validated.get(key)
+            if (
+                template is None
+                or not required <= per_item.keys()
+                or not all(
+                    isinstance(value, PER_ITEM_FIELDS[name])
+                    for name, value in per_item.items()
+                )
+            ):
+                parsed.append(EventType.parse_obj(event))
+                validated.setdefault(key, parsed[-1])
+                continue
+            parsed.append(template.copy(update={**defaults, **per_item}))
+        except Exception as e:
+            parsed.append(e)
+    return parsed
@@ -0,0 +1,75 @@
+import os
+import threading
+from typing import Dict
+
+import rasterio
+from rasterio.session import AWSSession
+
+from . import role
+
+# GDAL configuration options of each GDAL_PROFILE
+GDAL_PROFILES = {
+    "default": {
+        "GDAL_MAX_DATASET_POOL_SIZE": 1024,
+        "GDAL_DISABLE_READDIR_ON_OPEN": "FALSE",
+        "GDAL_CACHEMAX": 1024000000,
+        "GDAL_HTTP_MAX_RETRY": 4,
+        "GDAL_HTTP_RETRY_DELAY": 1,
+    },
+}
+# Opening a COG then only takes range requests for its header: no listing of
+# its directory, cached reads and several requests over one HTTP/2 connection
+GDAL_PROFILES["cog"] = {
+    **GDAL_PROFILES["default"],
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif,.TIF,.tiff,.TIFF",
+    "GDAL_INGESTED_BYTES_AT_OPEN": 32768,
+    "VSI_CACHE": "TRUE",
+    "VSI_CACHE_SIZE": 50000000,
+    "GDAL_HTTP_MULTIPLEX": "YES",
+    "GDAL_HTTP_VERSION": 2,
+    "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+}
+
+GDAL_PROFILE = os.environ.get("GDAL_PROFILE", "default")
+
+_local = threading.local()
+
+
+def gdal_options(profile: str = GDAL_PROFILE) -> Dict:
+    """
+    Options of a profile. Options set as environment variables (e.g.
+    VSI_CACHE_SIZE) are left out, so that GDAL takes them from the environment.
+    """
+    if profile not in GDAL_PROFILES:
+        raise ValueError(f"Unknown GDAL profile {profile}")
+    return {
+        name: value
+        for name, value in GDAL_PROFILES[profile].items()
+        if name not in os.environ
+    }
+
+
+def ensure_env(profile: str = GDAL_PROFILE) -> rasterio.Env:
+    """
+    Enter the rasterio environment of the calling thread, unless it already
+    was. Environments are kept for the life of their thread, so that GDAL's
+    dataset pool and connections are reused across items and invocations of a
+    warm container. The environment is entered again when the profile or the
+    external role's credentials change.
+    """
+    credentials = None
+    if role_arn := os.environ.get("EXTERNAL_ROLE_ARN"):
+        credentials = role.session_kwargs(role_arn, "veda-data-pipelines_build-stac")
+    key = (profile, credentials and credentials["aws_access_key_id"])
+    env = getattr(_local, "env", None)
+    if env is not None:
+        if _local.key == key:
+            return env
+        env.__exit__()
+
+    session = AWSSession(**credentials) if credentials else None
+    env = rasterio.Env(session=session, **gdal_options(profile))
+    env.__enter__()
+    _local.env, _local.key = env, key
+    return env
@@ -0,0 +1,99 @@
+import math
+import os
+from typing import Dict, List, Optional
+
+import numpy
+from rasterio.io import DatasetReader
+from rio_stac.stac import get_raster_info
+
+# How the raster:bands of an item are built:
+# - full: statistics from a read of up to 1024x1024 pixels (rio_stac's default)
+# - overview: statistics from the smallest overview
+# - header: statistics embedded in the GDAL metadata, falling back to the
+#   smallest overview for files that have none
+RASTER_METADATA_MODES = ("full", "overview", "header")
+# Mode of events that don't set raster_metadata
+RASTER_METADATA = os.environ.get("RASTER_METADATA", "full")
+
+# GDAL metadata items holding band statistics -> raster:bands statistics
+STATISTICS_TAGS = {
+    "STATISTICS_MINIMUM": "minimum",
+    "STATISTICS_MAXIMUM": "maximum",
+    "STATISTICS_MEAN": "mean",
+    "STATISTICS_STDDEV": "stddev",
+    "STATISTICS_VALID_PERCENT": "valid_percent",
+}
+
+
+def smallest_overview_size(src: DatasetReader) -> int:
+    """
+    Largest dimension of the smallest overview of the first band, or of the
+    full resolution image when there is no overview.
+    """
+    overviews = src.overviews(1)
+    if not overviews:
+        return max(src.width, src.height)
+    factor = max(overviews)
+    return max(math.ceil(src.width / factor), math.ceil(src.height / factor))
+
+
+def embedded_statistics(src: DatasetReader, band: int) -> Optional[Dict]:
+    """
+    Statistics GDAL stored in the file's metadata (e.g. by `gdalinfo -stats`),
+    if every one of minimum, maximum, mean and stddev is there.
+    """
+    tags = src.tags(band)
+    statistics = {
+        name: float(tags[tag]) for tag, name in STATISTICS_TAGS.items() if tag in tags
+    }
+    if not {"minimum", "maximum", "mean", "stddev"} <= statistics.keys():
+        return None
+    return statistics
+
+
+def band_info(src: DatasetReader, band: int) -> Dict:
+    """
+    raster:bands fields that only need the file's header.
+    """
+    value = {
+        "data_type": src.dtypes[band - 1],
+        "scale": src.scales[band - 1],
+        "offset": src.offsets[band - 1],
+    }
+    area_or_point = src.tags().get("AREA_OR_POINT", "").lower()
+    if area_or_point:
+        value["sampling"] = area_or_point
+    if src.nodata is not None:
+        if numpy.isnan(src.nodata):
+            value["nodata"] = "nan"
+        elif numpy.isinf(src.nodata):
+            value["nodata"] = "inf" if src.nodata > 0 else "-inf"
+        else:
+            value["nodata"] = src.nodata
+    if src.units[band - 1]:
+        value["unit"] = src.units[band - 1]
+    return value
+
+
+def get_raster_bands(src: DatasetReader, mode: str) -> List[Dict]:
+    """
+    raster:bands of a dataset opened by rasterio, without reading more pixels
+    than `mode` needs. Only the smallest overview is read in overview mode, and
+    in header mode only for files that have no embedded statistics.
+    """
+    if mode not in RASTER_METADATA_MODES:
+        raise ValueError(f"Unknown raster metadata mode {mode}")
+    if mode == "full":
+        return get_raster_info(src)
+
+    if mode == "header":
+        statistics = [embedded_statistics(src, band) for band in src.indexes]
+        if all(statistics):
+            return [
+                {**band_info(src, band), "statistics": band_statistics}
+                for band, band_statistics in zip(src.indexes, statistics)
+            ]
+
+    # Reading at the size of the smallest overview makes GDAL read that
+    # overview's tiles only
+    return get_raster_info(src, max_size=smallest_overview_size(src))
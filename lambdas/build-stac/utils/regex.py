@@ -1,24 +1,70 @@
 import re
-from typing import Callable, Dict, Tuple, Union
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
 from datetime import datetime, timezone
 from dateutil.relativedelta import relativedelta
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
 from . import events
 
 
 DATERANGE = Tuple[datetime, datetime]
 
 
+# Date formats in filenames, in order of preference: only dates of the first
+# format found in a filename are used. Digits are spelled [0-9] so that the
+# patterns match the same under Python's re and pyarrow's RE2.
+DATE_FORMAT_PATTERNS = {
+    "ymd": r"[0-9]{4}-[0-9]{2}-[0-9]{2}",
+    "ymd_compact": r"[0-9]{8}",
+    "ym": r"[0-9]{6}",
+    "y": r"[0-9]{4}",
+}
+# Every format, as named groups of one pattern
+DATE_PATTERN = re.compile(
+    "_(?:"
+    + "|".join(
+        f"(?P<{name}>{pattern})" for name, pattern in DATE_FORMAT_PATTERNS.items()
+    )
+    + ")"
+)
+DATE_FORMATS = {name: rank for rank, name in enumerate(DATE_PATTERN.groupindex)}
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(date_format: str, date_str: str) -> datetime:
+    if date_format == "ymd":
+        year, month, day = date_str[:4], date_str[5:7], date_str[8:]
+    elif date_format == "ymd_compact":
+        year, month, day = date_str[:4], date_str[4:6], date_str[6:]
+    elif date_format == "ym":
+        year, month, day = date_str[:4], date_str[4:], 1
+    else:
+        year, month, day = date_str, 1, 1
+    return datetime(int(year), int(month), int(day), tzinfo=timezone.utc)
+
+
+@lru_cache(maxsize=1024)
+def _year_range(year: int, tzinfo) -> DATERANGE:
+    return datetime(year, 1, 1, tzinfo=tzinfo), datetime(year, 12, 31, tzinfo=tzinfo)
+
+
+@lru_cache(maxsize=4096)
+def _month_range(year: int, month: int, tzinfo) -> DATERANGE:
+    start_datetime = datetime(year, month, 1, tzinfo=tzinfo)
+    return start_datetime, start_datetime + relativedelta(day=31)
+
+
 def _calculate_year_range(datetime_obj: datetime) -> DATERANGE:
-    start_datetime = datetime_obj.replace(month=1, day=1)
-    end_datetime = datetime_obj.replace(month=12, day=31)
-    return start_datetime, end_datetime
+    return _year_range(datetime_obj.year, datetime_obj.tzinfo)
 
 
 def _calculate_month_range(datetime_obj: datetime) -> DATERANGE:
-    start_datetime = datetime_obj.replace(day=1)
-    end_datetime = datetime_obj + relativedelta(day=31)
-    return start_datetime, end_datetime
+    return _month_range(datetime_obj.year, datetime_obj.month, datetime_obj.tzinfo)
 
 
 DATETIME_RANGE_METHODS: Dict[events.INTERVAL, Callable[[datetime], DATERANGE]] = {
@@ -33,26 +79,26 @@ def extract_dates(
     """
     Extracts start & end or single date string from filename.
     """
-    DATE_REGEX_STRATEGIES = [
-        (r"_(\d{4}-\d{2}-\d{2})", "%Y-%m-%d"),
-        (r"_(\d{8})", "%Y%m%d"),
-        (r"_(\d{6})", "%Y%m"),
-        (r"_(\d{4})", "%Y"),
-    ]
-
-    # Find dates in filename
-    dates = []
-    for pattern, dateformat in DATE_REGEX_STRATEGIES:
-        dates_found = re.compile(pattern).findall(filename)
-        if not dates_found:
-            continue
-
-        for date_str in dates_found:
-            date = datetime.strptime(date_str, dateformat)
-            date_tz = date.replace(tzinfo=timezone.utc)
-            dates.append(date_tz)
-
-        break
+    # Find dates in filename, keeping those of the preferred format
+    best_rank = len(DATE_FORMATS)
+    date_format, date_strs = None, []
+    for match in DATE_PATTERN.finditer(filename):
+        rank = DATE_FORMATS[match.lastgroup]
+        if rank < best_rank:
+            best_rank, date_format, date_strs = rank, match.lastgroup, []
+        if rank == best_rank:
+            date_strs.append(match.group(match.lastgroup))
+
+    return _to_dates(filename, date_format, date_strs, datetime_range)
+
+
+def _to_dates(
+    filename: str,
+    date_format: Optional[str],
+    date_strs: List[str],
+    datetime_range: events.INTERVAL,
+) -> Union[Tuple[datetime, datetime, None], Tuple[None, None, datetime]]:
+    dates = [_parse_date(date_format, date_str) for date_str in date_strs]
 
     num_dates_found = len(dates)
 
@@ -81,3 +127,104 @@ def extract_dates(
 
     # Return single date
     return None, None, single_datetime
+
+
+def _to_list(array: pa.Array) -> list:
+    # Much faster than to_pylist, which builds a pyarrow scalar per value
+    return array.to_numpy(zero_copy_only=False).tolist()
+
+
+def extract_dates_many(
+    filenames: Sequence[str], datetime_range: events.INTERVAL
+) -> List[
+    Union[Tuple[Optional[datetime], Optional[datetime], Optional[datetime]], Exception]
+]:
+    """
+    `extract_dates` of many filenames, e.g. the keys of a discovery manifest,
+    matched column-wise with pyarrow. A filename whose dates can't be extracted
+    gets the exception in place of its dates, so that it doesn't fail the
+    others.
+
+    Dates start at an underscore and hold none, so the dates a filename keeps
+    are all the matches of the first format that matches it at all. Formats
+    are counted in order of preference over the filenames no earlier format
+    matched, and the first and last date of each filename are extracted, which
+    are also its earliest and latest since every format sorts as text. Only
+    filenames with more than two dates are matched again in Python.
+    """
+    filenames = list(filenames)
+    dates: List = [None] * len(filenames)
+    # Dates by (format, first date, last date), which many filenames of a
+    # manifest share
+    found_dates: Dict[Tuple[str, str, Optional[str]], Union[Tuple, Exception]] = {}
+
+    keys = pa.array(filenames, pa.string())
+    rows = np.arange(len(filenames))
+    for date_format, pattern in DATE_FORMAT_PATTERNS.items():
+        if not len(rows):
+            break
+        counts = pc.count_substring_regex(keys, f"_{pattern}")
+        found = pc.greater(counts, 0)
+        counts, matched = counts.filter(found), keys.filter(found)
+        firsts = pc.extract_regex(matched, f"_(?P<date>{pattern})")
+        # The greedy prefix makes the last date the one extracted
+        lasts = pc.extract_regex(
+            matched.filter(pc.greater(counts, 1)), f"(?s).*_(?P<date>{pattern})"
+        )
+        lasts = iter(_to_list(lasts.field("date")))
+
+        found_rows = rows[found.to_numpy(zero_copy_only=False)].tolist()
+        for row, count, first in zip(
+            found_rows, _to_list(counts), _to_list(firsts.field("date"))
+        ):
+            last = next(lasts) if count > 1 else None
+            if count > 2:
+                date_strs = [
+                    match.group(date_format)
+                    for match in DATE_PATTERN.finditer(filenames[row])
+                    if match.lastgroup == date_format
+                ]
+                key = None
+            else:
+                date_strs = [first] if last is None else [first, last]
+                key = (date_format, first, last)
+                if key in found_dates:
+                    dates[row] = found_dates[key]
+                    continue
+            try:
+                row_dates = _to_dates(
+                    filenames[row], date_format, date_strs, datetime_range
+                )
+            except Exception as e:
+                row_dates = e
+            dates[row] = row_dates
+            if key:
+                found_dates[key] = row_dates
+
+        not_found = pc.invert(found)
+        keys = keys.filter(not_found)
+        rows = rows[not_found.to_numpy(zero_copy_only=False)]
+
+    for row in rows.tolist():
+        try:
+            dates[row] = _to_dates(filenames[row], None, [], datetime_range)
+        except Exception as e:
+            dates[row] = e
+    return dates
+
+
+def filename_stems(filenames: Sequence[str]) -> List[str]:
+    """
+    `Path(filename).stem` of many filenames, matched column-wise with pyarrow.
+    Filenames whose last part is empty or "." are left to pathlib, which
+    skips such parts.
+    """
+    keys = pa.array(list(filenames), pa.string())
+    matches = pc.extract_regex(keys, r"(?s)(?:^|/)(?P<stem>[^/]+?)(?:\.[^./]+)?$")
+    odd = pc.or_(
+        pc.is_null(matches), pc.or_(pc.equal(keys, "."), pc.ends_with(keys, "/."))
+    )
+    stems = _to_list(matches.field("stem"))
+    for row in np.flatnonzero(odd.to_numpy(zero_copy_only=False)).tolist():
+        stems[row] = Path(filenames[row]).stem
+    return stems
@@ -1,7 +1,12 @@
 import os
+import threading
+import time
 
+from collections import OrderedDict
 from pathlib import Path
 from functools import singledispatch
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
 import pystac
 import rasterio
@@ -9,9 +14,93 @@ import rasterio
 from cmr import GranuleQuery
 from pystac.utils import str_to_datetime
 from rio_stac import stac
-from rasterio.session import AWSSession
+from rio_stac.stac import RASTER_EXT_VERSION
 
-from . import regex, events, role
+from . import regex, events, gdal, raster
+
+CMR_CACHE_SIZE = int(os.environ.get("CMR_CACHE_SIZE", 10000))
+CMR_CACHE_TTL = float(os.environ.get("CMR_CACHE_TTL", 3600))
+# Concept ids per CMR search request
+CMR_BATCH_SIZE = int(os.environ.get("CMR_BATCH_SIZE", 100))
+
+
+class CmrMetadataClient:
+    """
+    Granule records by concept id. Records missing from the cache are fetched
+    with one CMR search per `batch_size` ids, and kept in a least recently used
+    cache of `maxsize` records for `ttl` seconds, so that warm containers and
+    batches of items from one collection don't query CMR once per item.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = CMR_CACHE_SIZE,
+        ttl: float = CMR_CACHE_TTL,
+        batch_size: int = CMR_BATCH_SIZE,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, granule_id: str, now: float) -> Optional[Dict]:
+        entry = self._cache.get(granule_id)
+        if entry is None:
+            return None
+        expires, record = entry
+        if expires < now:
+            del self._cache[granule_id]
+            return None
+        self._cache.move_to_end(granule_id)
+        return record
+
+    def _store(self, record: Dict, now: float) -> None:
+        self._cache[record["id"]] = (now + self.ttl, record)
+        self._cache.move_to_end(record["id"])
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def get_many(self, granule_ids: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Records of the granules found in CMR, by concept id.
+        """
+        found, missing = {}, []
+        with self._lock:
+            now = time.monotonic()
+            for granule_id in dict.fromkeys(granule_ids):
+                record = self._cached(granule_id, now)
+                if record is None:
+                    self.misses += 1
+                    missing.append(granule_id)
+                else:
+                    self.hits += 1
+                    found[granule_id] = record
+
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i : i + self.batch_size]
+            records = GranuleQuery().concept_id(batch).get(len(batch))
+            with self._lock:
+                now = time.monotonic()
+                for record in records:
+                    self._store(record, now)
+                    found[record["id"]] = record
+        return found
+
+    def get(self, granule_id: str) -> Dict:
+        try:
+            return self.get_many([granule_id])[granule_id]
+        except KeyError:
+            raise KeyError(f"Granule {granule_id} not found in CMR")
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+
+# Shared by every invocation of a warm container
+cmr_client = CmrMetadataClient()
 
 
 def create_item(
@@ -24,50 +113,72 @@ def create_item(
     asset_name=None,
     asset_roles=None,
     asset_media_type=None,
+    raster_metadata=None,
 ) -> pystac.Item:
     """
     Function to create a stac item from a COG using rio_stac
+
+    `raster_metadata` (see utils.raster) selects how band statistics are
+    computed. Except in "full" mode, the file is opened once and rio_stac only
+    reads its header, the statistics coming from the smallest overview or the
+    file's GDAL metadata.
     """
+    raster_metadata = raster_metadata or raster.RASTER_METADATA
+    asset_name = asset_name or "cog_default"
 
     def create_stac_item():
-        return stac.create_stac_item(
-            id=id,
-            source=cog_url,
-            collection=collection,
-            input_datetime=datetime,
-            properties=properties,
-            with_proj=True,
-            with_raster=True,
-            assets=assets,
-            asset_name=asset_name or "cog_default",
-            asset_roles=asset_roles or ["data", "layer"],
-            asset_media_type=(
-                asset_media_type
-                or "image/tiff; application=geotiff; profile=cloud-optimized"
-            ),
-        )
+        if raster_metadata == "full":
+            return stac.create_stac_item(
+                id=id,
+                source=cog_url,
+                collection=collection,
+                input_datetime=datetime,
+                properties=properties,
+                with_proj=True,
+                with_raster=True,
+                assets=assets,
+                asset_name=asset_name,
+                asset_roles=asset_roles or ["data", "layer"],
+                asset_media_type=(
+                    asset_media_type
+                    or "image/tiff; application=geotiff; profile=cloud-optimized"
+                ),
+            )
 
-    rasterio_kwargs = {}
-    if role_arn := os.environ.get("EXTERNAL_ROLE_ARN"):
-        creds = role.assume_role(role_arn, "veda-data-pipelines_build-stac")
-        rasterio_kwargs["session"] = AWSSession(
-            aws_access_key_id=creds["AccessKeyId"],
-            aws_secret_access_key=creds["SecretAccessKey"],
-            aws_session_token=creds["SessionToken"],
+        with rasterio.open(cog_url) as src:
+            item = stac.create_stac_item(
+                id=id,
+                source=src,
+                collection=collection,
+                input_datetime=datetime,
+                properties=properties,
+                with_proj=True,
+                with_raster=False,
+                assets=assets,
+                asset_name=asset_name,
+                asset_href=cog_url,
+                asset_roles=asset_roles or ["data", "layer"],
+                asset_media_type=(
+                    asset_media_type
+                    or "image/tiff; application=geotiff; profile=cloud-optimized"
+                ),
+            )
+            raster_bands = raster.get_raster_bands(src, raster_metadata)
+        item.stac_extensions.append(
+            f"https://stac-extensions.github.io/raster/{RASTER_EXT_VERSION}/schema.json"
         )
+        if asset_name in item.assets:
+            item.assets[asset_name].extra_fields["raster:bands"] = raster_bands
+        return item
 
-    with rasterio.Env(
-        session=rasterio_kwargs["session"],
-        options={
-            **rasterio_kwargs,
-            "GDAL_MAX_DATASET_POOL_SIZE": 1024,
-            "GDAL_DISABLE_READDIR_ON_OPEN": False,
-            "GDAL_CACHEMAX": 1024000000,
-            "GDAL_HTTP_MAX_RETRY": 4,
-            "GDAL_HTTP_RETRY_DELAY": 1,
-        },
-    ):
-        return create_stac_item()
+    gdal.ensure_env()
+    start = time.perf_counter()
+    item = create_stac_item()
+    print(
+        f"Created item {id} in {time.perf_counter() - start:.3f}s "
+        f"(raster_metadata={raster_metadata}, GDAL profile {gdal.GDAL_PROFILE})"
+    )
+    return item
 
 
 @singledispatch
@@ -75,31 +186,29 @@ def generate_stac(item) -> pystac.Item:
     raise Exception(f"Unsupport event type: {type(item)=}, {item=}")
 
 
-@generate_stac.register
-def generate_stac_regexevent(item: events.RegexEvent) -> pystac.Item:
-    """
-    Generate STAC item from user provided datetime range or regex & filename
-    """
+def _given_dates(item: events.RegexEvent) -> Optional[Tuple]:
     if item.start_datetime and item.end_datetime:
-        start_datetime = item.start_datetime
-        end_datetime = item.end_datetime
-        single_datetime = None
-    elif single_datetime := item.single_datetime:
-        start_datetime = end_datetime = None
-        single_datetime = single_datetime
-    else:
-        start_datetime, end_datetime, single_datetime = regex.extract_dates(
-            item.s3_filename, item.datetime_range
-        )
-    properties = item.properties or {}
+        return item.start_datetime, item.end_datetime, None
+    if item.single_datetime:
+        return None, None, item.single_datetime
+    return None
+
+
+def _regex_item_fields(
+    item: events.RegexEvent,
+    dates: Tuple[datetime, datetime, datetime],
+    item_id: Optional[str] = None,
+) -> Dict:
+    start_datetime, end_datetime, single_datetime = dates
+    properties = dict(item.properties or {})
     if start_datetime and end_datetime:
         # these are added post-serialization to properties, unlike single_datetime
         properties["start_datetime"] = start_datetime.strftime("%Y-%m-%dT%H:%M:%SZ")
         properties["end_datetime"] = end_datetime.strftime("%Y-%m-%dT%H:%M:%SZ")
         single_datetime = None
 
-    return create_item(
-        id=item.item_id(),
+    return dict(
+        id=item.item_id() if item_id is None else item_id,
         properties=properties,
         datetime=single_datetime,
         cog_url=item.s3_filename,
@@ -107,7 +216,71 @@ def generate_stac_regexevent(item: events.RegexEvent) -> pystac.Item:
         asset_name=item.asset_name,
         asset_roles=item.asset_roles,
         asset_media_type=item.asset_media_type,
+        raster_metadata=item.raster_metadata,
+    )
+
+
+def regex_item_fields(item: events.RegexEvent) -> Dict:
+    """
+    `create_item` arguments of a regex event: its id, and its datetime from the
+    event or extracted from its filename.
+    """
+    dates = _given_dates(item) or regex.extract_dates(
+        item.s3_filename, item.datetime_range
     )
+    return _regex_item_fields(item, dates)
+
+
+def regex_item_table(
+    items: Sequence[events.RegexEvent],
+) -> List[Union[Dict, Exception]]:
+    """
+    `regex_item_fields` of a whole batch, e.g. a discovery manifest, in the
+    order of `items`. Dates are extracted column-wise from the filenames of
+    each datetime_range with `regex.extract_dates_many`, and the ids of events
+    without id_regex with `regex.filename_stems`. The row of an event whose
+    fields can't be derived holds the exception, so that only that item fails.
+    """
+    dates = [_given_dates(item) for item in items]
+
+    by_range: Dict[Optional[str], List[int]] = {}
+    for i, item in enumerate(items):
+        if dates[i] is None:
+            by_range.setdefault(item.datetime_range, []).append(i)
+    for datetime_range, indexes in by_range.items():
+        extracted = regex.extract_dates_many(
+            [items[i].s3_filename for i in indexes], datetime_range
+        )
+        for i, item_dates in zip(indexes, extracted):
+            dates[i] = item_dates
+
+    ids: List[Optional[str]] = [None] * len(items)
+    stem_indexes = [i for i, item in enumerate(items) if not item.id_regex]
+    stems = regex.filename_stems([items[i].s3_filename for i in stem_indexes])
+    for i, stem in zip(stem_indexes, stems):
+        ids[i] = stem
+
+    table = []
+    for item, item_dates, item_id in zip(items, dates, ids):
+        if isinstance(item_dates, Exception):
+            table.append(item_dates)
+            continue
+        try:
+            table.append(_regex_item_fields(item, item_dates, item_id))
+        except Exception as e:
+            table.append(e)
+    return table
+
+
+@generate_stac.register
+def generate_stac_regexevent(
+    item: events.RegexEvent, fields: Optional[Dict] = None
+) -> pystac.Item:
+    """
+    Generate STAC item from user provided datetime range or regex & filename,
+    or from its row of `regex_item_table`
+    """
+    return create_item(**(fields or regex_item_fields(item)))
 
 
 @generate_stac.register
@@ -115,7 +288,9 @@ def generate_stac_cmrevent(item: events.CmrEvent) -> pystac.Item:
     """
     Generate STAC Item from CMR granule
     """
-    cmr_json = GranuleQuery().concept_id(item.granule_id).get(1)[0]
+    cmr_json = item.cmr_metadata
+    if not cmr_json or "time_start" not in cmr_json:
+        cmr_json = cmr_client.get(item.granule_id)
 
     return create_item(
         id=item.item_id(),
@@ -126,4 +301,5 @@ def generate_stac_cmrevent(item: events.CmrEvent) -> pystac.Item:
         asset_name=item.asset_name,
         asset_roles=item.asset_roles,
         asset_media_type=item.asset_media_type,
+        raster_metadata=item.raster_metadata,
     )
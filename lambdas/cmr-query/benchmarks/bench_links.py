@@ -0,0 +1,109 @@
+"""
+Benchmark link selection over a synthetic CMR response.
+
+Compares the selector used by the handler with the previous inline loop, which
+looked up the include regex again for every data link:
+
+    python benchmarks/bench_links.py --granules 100000
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.links import DATA_REL, LinkSelector  # noqa: E402
+
+
+def synthetic_granules(count: int):
+    """
+    Granules shaped like CMR JSON records, with a data link, a browse image, a
+    metadata link and an s3 data link each.
+    """
+    base = "https://data.example.com/PROVIDER/COLLECTION.001"
+    return [
+        {
+            "id": f"G{i:09d}-PROVIDER",
+            "time_start": "2022-01-01T00:00:00.000Z",
+            "links": [
+                {"rel": DATA_REL, "href": f"{base}/granule_{i:09d}.nc"},
+                {
+                    "rel": "http://esipfed.org/ns/fedsearch/1.1/browse#",
+                    "href": f"{base}/granule_{i:09d}.png",
+                },
+                {
+                    "rel": "http://esipfed.org/ns/fedsearch/1.1/metadata#",
+                    "href": f"{base}/granule_{i:09d}.xml",
+                },
+                {"rel": DATA_REL, "href": f"s3://bucket/granule_{i:09d}.nc"},
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def inline(granules, event):
+    urls = []
+    for granule in granules:
+        for link in granule["links"]:
+            if event.get("mode") == "stac":
+                if link["href"][-9:] == "stac.json" and link["href"][0:5] == "https":
+                    urls.append(link)
+            else:
+                if link["rel"] == DATA_REL:
+                    href = link["href"]
+                    file_obj = {"href": href, "granule_id": granule["id"]}
+                    if event["include"]:
+                        pattern = re.compile(event["include"])
+                        if pattern.match(href):
+                            urls.append(file_obj)
+                    else:
+                        urls.append(file_obj)
+    return urls
+
+
+def selector(granules, event):
+    return [
+        {"href": link["href"], "granule_id": granule["id"]}
+        for granule, link in LinkSelector.from_event(event).select_granules(granules)
+    ]
+
+
+def best_of(func, repeat, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--granules", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    granules = synthetic_granules(args.granules)
+    events = {
+        "include": {"include": "^https.+nc$"},
+        "no-include": {"include": None},
+        "stac": {"mode": "stac", "include": None},
+    }
+
+    print(f"{'case':<12} {'inline (s)':>11} {'selector (s)':>13} {'ns/granule':>11}")
+    for name, event in events.items():
+        inline_time, expected = best_of(inline, args.repeat, granules, event)
+        selector_time, actual = best_of(selector, args.repeat, granules, event)
+        assert actual == expected, name
+        per_granule = (inline_time - selector_time) / args.granules * 1e9
+        print(
+            f"{name:<12} {inline_time:>11.3f} {selector_time:>13.3f} "
+            f"{per_granule:>+11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+from unittest.mock import patch
+
+import boto3
+import pytest
+from moto import mock_s3
+
+from utils import search
+
+
+@pytest.fixture
+def aws_credentials():
+    """Mocked AWS Credentials for moto."""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+
+@pytest.fixture
+def s3_client(aws_credentials):
+    with mock_s3():
+        yield boto3.client("s3", region_name="us-east-1")
+
+
+def make_granule(i, updated="2022-01-01T00:00:00.000Z"):
+    return {
+        "id": f"G{i:04d}-TEST",
+        "updated": updated,
+        "time_start": f"2022-01-{i % 28 + 1:02d}T00:00:00.000Z",
+        "time_end": f"2022-01-{i % 28 + 1:02d}T23:59:59.999Z",
+        "links": [
+            {
+                "rel": "http://esipfed.org/ns/fedsearch/1.1/data#",
+                "href": f"https://data.example.com/granule_{i:04d}.nc",
+            },
+            {
+                "rel": "http://esipfed.org/ns/fedsearch/1.1/metadata#",
+                "href": f"https://data.example.com/granule_{i:04d}.xml",
+            },
+        ],
+    }
+
+
+class MockResponse:
+    def __init__(self, entries, search_after):
+        self.entries = entries
+        self.headers = {"CMR-Search-After": search_after} if search_after else {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"feed": {"entry": self.entries}}
+
+
+class MockCMR:
+    """
+    Stands in for the CMR granule search API. Granules overlapping the
+    temporal range, and revised since the revision date when one is given,
+    are returned in pages, sorted by id.
+    """
+
+    def __init__(self, granules):
+        self.granules = granules
+        self.requests = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.requests.append((url, headers))
+        query = dict(
+            (key.rstrip("[]"), value.split(","))
+            for key, value in (p.split("=", 1) for p in url.split("?")[1].split("&"))
+        )
+        start, end = (f"{t[:-1]}.000Z" for t in query["temporal"])
+        matches = sorted(
+            (
+                g
+                for g in self.granules
+                if g["time_start"] <= end
+                and g["time_end"] >= start
+                and g["updated"] >= query.get("revision_date", [""])[0]
+            ),
+            key=lambda g: g["id"],
+        )
+        offset = int((headers or {}).get("CMR-Search-After", 0))
+        page = matches[offset : offset + params["page_size"]]
+        return MockResponse(page, str(offset + len(page)))
+
+
+@pytest.fixture
+def cmr_granules():
+    """
+    Granules returned by CMR searches, one per day of January 2022.
+    """
+    granules = [make_granule(i) for i in range(10)]
+    with patch.object(search, "session", MockCMR(granules)):
+        yield granules
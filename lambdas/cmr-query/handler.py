@@ -1,9 +1,30 @@
-import re
+import json
+import os
+import uuid
 
 import datetime as dt
 
+import boto3
 from cmr import GranuleQuery
 
+from utils.links import LinkSelector
+from utils.manifest import ManifestWriter
+from utils.search import GRANULE_FIELDS, search_granules
+from utils.state import DISCOVERY_STATE, StateStore
+
+# Step Functions limit on state payloads, in bytes
+MAX_PAYLOAD_SIZE = 256 * 1024
+
+
+def cmr_metadata(granule, fields):
+    """
+    The granule's CMR record without its links, or only `fields` when given a
+    list.
+    """
+    if isinstance(fields, list):
+        return {field: granule[field] for field in fields if field in granule}
+    return {key: value for key, value in granule.items() if key != "links"}
+
 
 def handler(event, context):
     """
@@ -17,43 +38,113 @@ def handler(event, context):
     enddate = dt.datetime.strptime(temporal[1], "%Y-%m-%dT%H:%M:%SZ")
     print(f"Querying for {collection} granules from {startdate} to {enddate}")
 
-    api = GranuleQuery()
-    granules = (
-        api.short_name(collection)
-        .version(version)
-        .temporal(startdate, enddate)
-        .bounding_box(*event.get("bounding_box", [-180, -90, 180, 90]))
-        .get_all()
+    revision_date = None
+    incremental = event.get("incremental", False)
+    if incremental:
+        started = dt.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        store = StateStore(
+            "cmr", event.get("state_location", DISCOVERY_STATE), boto3.client("s3")
+        )
+        # A different query (e.g. a backfill of another temporal range) must
+        # not start from this one's watermark
+        state_query = {
+            "version": version,
+            "temporal": temporal,
+            "bounding_box": event.get("bounding_box"),
+            "include": event.get("include"),
+            "exclude": event.get("exclude"),
+            "mode": event.get("mode"),
+        }
+        state = store.load(collection, state_query)
+        if state.watermark:
+            # Only granules created or updated since the last run
+            print(f"Querying for granules revised since {state.watermark}")
+            revision_date = state.watermark
+
+    def query():
+        q = (
+            GranuleQuery()
+            .short_name(collection)
+            .version(version)
+            .bounding_box(*event.get("bounding_box", [-180, -90, 180, 90]))
+        )
+        if revision_date:
+            q = q.revision_date(revision_date, None)
+        return q
+
+    # Granule metadata passed on to build-stac, so it doesn't query CMR again
+    carry_metadata = event.get("carry_metadata", False)
+    granules = search_granules(
+        query, startdate, enddate, fields=None if carry_metadata else GRANULE_FIELDS
     )
+    selector = LinkSelector.from_event(event)
+    stac = event.get("mode") == "stac"
+
+    def new_granules():
+        for granule in granules:
+            # The revision window is inclusive, skip granules already emitted
+            if state.is_new(granule["id"], granule.get("updated", "")):
+                state.add(granule["id"], granule.get("updated", ""))
+                yield granule
+
+    def discover():
+        for granule, link in selector.select_granules(
+            new_granules() if incremental else granules
+        ):
+            if stac:
+                yield link
+                continue
+            file_obj = {
+                "collection": collection,
+                "href": link["href"],
+                "granule_id": granule["id"],
+                "id": granule["id"],
+                "mode": event.get("mode"),
+                # "start_datetime": granule["time_start"],
+                # "end_datetime": granule["time_end"]
+            }
+            if carry_metadata:
+                file_obj["cmr_metadata"] = cmr_metadata(granule, carry_metadata)
+            if "raster_metadata" in event:
+                # Passed on to build-stac, through cogify
+                file_obj["raster_metadata"] = event["raster_metadata"]
+            yield file_obj
+
+    if event.get("manifest"):
+        # Written to NDJSON manifests on S3 when too many for a step function
+        # payload
+        run_id = getattr(context, "aws_request_id", None) or uuid.uuid4().hex
+        with ManifestWriter(
+            boto3.client("s3"),
+            event.get("manifest_bucket", os.environ.get("MANIFEST_BUCKET")),
+            f"discovery/{collection}/{run_id}",
+        ) as writer:
+            writer.write_all(discover())
+        print(f"Returning {writer.count} urls in {len(writer.manifests)} manifests")
+        response = {
+            "cogify": event.get("cogify", False),
+            "collection": collection,
+            "manifests": writer.manifests,
+            "count": writer.count,
+        }
+    else:
+        urls = list(discover())
+        print(f"Returning {len(urls)} urls")
+        response = {"cogify": event.get("cogify", False), "objects": urls}
+        if incremental and len(json.dumps(response).encode()) > MAX_PAYLOAD_SIZE:
+            # Saving the state would mark granules that are never delivered as
+            # discovered
+            print(
+                f"{len(urls)} urls exceed the Step Functions payload limit, "
+                "use manifest mode"
+            )
+            raise ValueError("Incremental discovery response too large for a payload")
+
+    if incremental:
+        state.watermark = started
+        store.save(collection, state, state_query)
 
-    urls = []
-    for granule in granules:
-        for link in granule["links"]:
-            if event.get("mode") == "stac":
-                if link["href"][-9:] == "stac.json" and link["href"][0:5] == "https":
-                    urls.append(link)
-            else:
-                if link["rel"] == "http://esipfed.org/ns/fedsearch/1.1/data#":
-                    href = link["href"]
-                    file_obj = {
-                        "collection": collection,
-                        "href": href,
-                        "granule_id": granule["id"],
-                        "id": granule["id"],
-                        "mode": event.get("mode"),
-                        # "start_datetime": granule["time_start"],
-                        # "end_datetime": granule["time_end"]
-                    }
-                    if event["include"]:
-                        pattern = re.compile(event["include"])
-                        matched = pattern.match(href)
-                        if matched:
-                            urls.append(file_obj)
-                    else:
-                        urls.append(file_obj)
-
-    print(f"Returning {len(urls)} urls")
-    return {"cogify": event.get("cogify", False), "objects": urls}
+    return response
 
 
 if __name__ == "__main__":
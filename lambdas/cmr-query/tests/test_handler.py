@@ -0,0 +1,102 @@
+import handler
+from conftest import make_granule
+
+EVENT = {"collection": "TEST", "version": "1", "include": "^.+nc$"}
+
+
+def test_handler(cmr_granules):
+    response = handler.handler(dict(EVENT), None)
+
+    assert len(response["objects"]) == 10
+    assert response["objects"][0] == {
+        "collection": "TEST",
+        "href": "https://data.example.com/granule_0000.nc",
+        "granule_id": "G0000-TEST",
+        "id": "G0000-TEST",
+        "mode": None,
+    }
+
+
+def test_incremental(cmr_granules, tmp_path):
+    """
+    Ensure reruns only emit new or updated granules.
+    """
+    event = {**EVENT, "incremental": True, "state_location": str(tmp_path)}
+
+    assert len(handler.handler(dict(event), None)["objects"]) == 10
+    assert handler.handler(dict(event), None)["objects"] == []
+
+    cmr_granules[3] = make_granule(3, updated="2999-01-01T00:00:00.000Z")
+    cmr_granules.append(make_granule(10, updated="2999-01-01T00:00:00.000Z"))
+    response = handler.handler(dict(event), None)
+    assert [o["id"] for o in response["objects"]] == ["G0003-TEST", "G0010-TEST"]
+
+    # Still within the revision window, but already emitted
+    assert handler.handler(dict(event), None)["objects"] == []
+
+
+def test_incremental_s3_state(cmr_granules, s3_client):
+    s3_client.create_bucket(Bucket="state-bucket")
+    event = {
+        **EVENT,
+        "incremental": True,
+        "state_location": "s3://state-bucket/discovery",
+    }
+
+    assert len(handler.handler(dict(event), None)["objects"]) == 10
+    assert handler.handler(dict(event), None)["objects"] == []
+    state_files = s3_client.list_objects_v2(Bucket="state-bucket")["Contents"]
+    assert len(state_files) == 1
+    assert state_files[0]["Key"].startswith("discovery/cmr-TEST-")
+
+
+def test_incremental_state_per_query(cmr_granules, tmp_path):
+    """
+    Ensure a run over another temporal range doesn't start from the watermark
+    of an earlier query, which would skip its unrevised granules.
+    """
+    event = {**EVENT, "incremental": True, "state_location": str(tmp_path)}
+    first_days = {**event, "temporal": ["2022-01-01T00:00:00Z", "2022-01-05T23:59:59Z"]}
+
+    assert len(handler.handler(dict(first_days), None)["objects"]) == 5
+    assert len(handler.handler(dict(event), None)["objects"]) == 10
+    assert handler.handler(dict(first_days), None)["objects"] == []
+
+
+def test_handler_manifest(cmr_granules, s3_client):
+    s3_client.create_bucket(Bucket="manifest-bucket")
+
+    response = handler.handler(
+        {**EVENT, "manifest": True, "manifest_bucket": "manifest-bucket"}, None
+    )
+
+    assert "objects" not in response
+    assert response["count"] == 10
+    body = s3_client.get_object(
+        Bucket="manifest-bucket",
+        Key=response["manifests"][0]["manifest"].split("manifest-bucket/")[1],
+    )["Body"].read()
+    assert len(body.splitlines()) == 10
+
+
+def test_carry_metadata(cmr_granules):
+    cmr_granules[0]["boxes"] = ["-90 -180 90 180"]
+
+    response = handler.handler({**EVENT, "carry_metadata": True}, None)
+    metadata = response["objects"][0]["cmr_metadata"]
+    assert metadata["time_start"] == cmr_granules[0]["time_start"]
+    assert metadata["boxes"] == ["-90 -180 90 180"]
+    assert "links" not in metadata
+
+    response = handler.handler(
+        {**EVENT, "carry_metadata": ["time_start", "time_end"]}, None
+    )
+    assert set(response["objects"][0]["cmr_metadata"]) == {"time_start", "time_end"}
+
+    assert "cmr_metadata" not in handler.handler(dict(EVENT), None)["objects"][0]
+
+
+def test_raster_metadata_passthrough(cmr_granules):
+    response = handler.handler({**EVENT, "raster_metadata": "header"}, None)
+
+    assert {o["raster_metadata"] for o in response["objects"]} == {"header"}
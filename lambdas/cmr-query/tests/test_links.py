@@ -0,0 +1,33 @@
+import pytest
+
+from utils.links import DATA_REL, LinkSelector
+
+DATA = {"rel": DATA_REL, "href": "https://data.example.com/granule.nc"}
+METADATA = {
+    "rel": "http://esipfed.org/ns/fedsearch/1.1/metadata#",
+    "href": "https://data.example.com/granule.xml",
+}
+STAC = {"rel": DATA_REL, "href": "https://data.example.com/granule.stac.json"}
+S3 = {"rel": DATA_REL, "href": "s3://bucket/granule.nc"}
+LINKS = [DATA, METADATA, STAC, S3]
+
+
+@pytest.mark.parametrize(
+    "event,expected",
+    [
+        ({"include": None}, [DATA, STAC, S3]),
+        ({"include": "^.+nc$"}, [DATA, S3]),
+        ({"include": "^https"}, [DATA, STAC]),
+        ({"include": "^.+nc$", "exclude": "^s3"}, [DATA]),
+        ({"mode": "stac", "include": "^.+nc$"}, [STAC]),
+    ],
+)
+def test_from_event(event, expected):
+    assert list(LinkSelector.from_event(event).select(LINKS)) == expected
+
+
+def test_selector():
+    selector = LinkSelector(suffix=(".nc", ".xml"), protocol="https")
+
+    assert list(selector.select(LINKS)) == [DATA, METADATA]
+    assert list(LinkSelector().select(LINKS)) == LINKS
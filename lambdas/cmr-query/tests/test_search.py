@@ -0,0 +1,90 @@
+import datetime as dt
+from unittest.mock import patch
+
+from cmr import GranuleQuery
+
+from utils import search
+
+
+def query():
+    return GranuleQuery().short_name("TEST").version("1")
+
+
+def test_split_temporal():
+    start, end = dt.datetime(2022, 1, 1), dt.datetime(2022, 1, 5)
+
+    windows = search.split_temporal(start, end, 4)
+
+    assert windows == [
+        (dt.datetime(2022, 1, d), dt.datetime(2022, 1, d + 1)) for d in range(1, 5)
+    ]
+    assert search.split_temporal(start, start, 4) == [(start, start)]
+
+
+def test_search_granules(cmr_granules):
+    """
+    Ensure every granule is found once across windows and pages, including
+    granules on the boundary of two windows.
+    """
+    granules = list(
+        search.search_granules(
+            query,
+            dt.datetime(2022, 1, 1),
+            dt.datetime(2022, 1, 11),
+            windows=4,
+            page_size=2,
+        )
+    )
+
+    assert sorted(g["id"] for g in granules) == [g["id"] for g in cmr_granules]
+    assert len(search.session.requests) > 4
+    assert any(headers for _, headers in search.session.requests)
+
+
+def test_search_granules_projects_fields(cmr_granules):
+    cmr_granules[0]["polygons"] = [["0 0 1 1 0 0"]]
+
+    granule = next(
+        search.search_granules(
+            query, dt.datetime(2022, 1, 1), dt.datetime(2022, 1, 1), windows=1
+        )
+    )
+
+    assert set(granule) == {"id", "time_start", "time_end", "updated", "links"}
+
+
+def test_crosses():
+    boundaries = [dt.datetime(2022, 1, 5)]
+    granule = {"time_start": "2022-01-04T00:00:00.000Z"}
+
+    assert search.crosses({**granule, "time_end": "2022-01-05T00:00:00Z"}, boundaries)
+    assert not search.crosses(
+        {**granule, "time_end": "2022-01-04T23:59:59.999Z"}, boundaries
+    )
+    assert search.crosses({"id": "G1"}, boundaries)
+
+
+def test_search_granules_only_keeps_boundary_ids(cmr_granules):
+    """
+    Ensure only granules on window boundaries are remembered for deduplication,
+    and that those are still returned once.
+    """
+    kept = []
+
+    def crosses(granule, boundaries):
+        if search_crosses(granule, boundaries):
+            kept.append(granule["id"])
+            return True
+        return False
+
+    search_crosses = search.crosses
+    with patch.object(search, "crosses", crosses):
+        granules = list(
+            search.search_granules(
+                query, dt.datetime(2022, 1, 1), dt.datetime(2022, 1, 11), windows=2
+            )
+        )
+
+    assert sorted(g["id"] for g in granules) == [g["id"] for g in cmr_granules]
+    # Only the granule of 2022-01-06 spans the boundary
+    assert kept == ["G0005-TEST"]
@@ -0,0 +1,74 @@
+import re
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+DATA_REL = "http://esipfed.org/ns/fedsearch/1.1/data#"
+
+
+def _as_tuple(value: Optional[Union[str, Sequence[str]]]) -> tuple:
+    if not value:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return tuple(value)
+
+
+class LinkSelector:
+    """
+    Selects the links of a granule to discover. A link is selected when its
+    `rel` is one of `rel`, its href ends with one of `suffix`, starts with one
+    of `protocol`, matches `include` and doesn't match `exclude` (regexes,
+    with `re.match`). Unset criteria select every link.
+
+    Everything is compiled once, and the cheap string checks run before the
+    regexes.
+    """
+
+    def __init__(
+        self,
+        rel: Optional[Union[str, Sequence[str]]] = None,
+        suffix: Optional[Union[str, Sequence[str]]] = None,
+        protocol: Optional[Union[str, Sequence[str]]] = None,
+        include: Optional[str] = None,
+        exclude: Optional[str] = None,
+    ):
+        self.rel = frozenset(_as_tuple(rel))
+        self.suffix = _as_tuple(suffix)
+        self.protocol = _as_tuple(protocol)
+        self.include = re.compile(include).match if include else None
+        self.exclude = re.compile(exclude).match if exclude else None
+
+    @classmethod
+    def from_event(cls, event: dict) -> "LinkSelector":
+        if event.get("mode") == "stac":
+            return cls(suffix="stac.json", protocol="https")
+        return cls(
+            rel=DATA_REL,
+            include=event.get("include"),
+            exclude=event.get("exclude"),
+        )
+
+    def __call__(self, link: dict) -> bool:
+        return bool(self.select([link]))
+
+    def select(self, links: Iterable[dict]) -> List[dict]:
+        return [link for _, link in self.select_granules([{"links": links}])]
+
+    def select_granules(self, granules: Iterable[dict]) -> Iterator[Tuple[dict, dict]]:
+        """
+        Yield (granule, link) for the selected links of every granule, in a
+        single loop so that no call is made per granule or per link.
+        """
+        rel, suffix, protocol = self.rel, self.suffix, self.protocol
+        include, exclude = self.include, self.exclude
+        for granule in granules:
+            for link in granule["links"]:
+                if rel and link.get("rel") not in rel:
+                    continue
+                href = link["href"]
+                if (
+                    (not suffix or href.endswith(suffix))
+                    and (not protocol or href.startswith(protocol))
+                    and (not include or include(href))
+                    and (not exclude or not exclude(href))
+                ):
+                    yield granule, link
@@ -0,0 +1,135 @@
+import datetime as dt
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+import requests
+from cmr import GranuleQuery
+
+SEARCH_CONCURRENCY = int(os.environ.get("CMR_SEARCH_CONCURRENCY", 8))
+PAGE_SIZE = int(os.environ.get("CMR_PAGE_SIZE", 2000))
+TIMEOUT = float(os.environ.get("CMR_TIMEOUT", 60))
+
+# Fields of a granule record that are kept, everything else is dropped as soon
+# as a page arrives
+GRANULE_FIELDS = ("id", "time_start", "time_end", "updated", "links")
+
+session = requests.Session()
+
+
+def split_temporal(
+    start: dt.datetime, end: dt.datetime, windows: int
+) -> List[Tuple[dt.datetime, dt.datetime]]:
+    """
+    Split [start, end] into `windows` consecutive ranges of equal length.
+    """
+    step = (end - start) / windows
+    bounds = [start + step * i for i in range(windows)] + [end]
+    return [
+        (bounds[i], bounds[i + 1]) for i in range(windows) if bounds[i] < bounds[i + 1]
+    ] or [(start, end)]
+
+
+def project(granule: dict, fields: Optional[Sequence[str]] = GRANULE_FIELDS) -> dict:
+    # Links are kept whole, stac mode returns them as they are
+    if fields is None:
+        return granule
+    return {field: granule[field] for field in fields if field in granule}
+
+
+def _parse_time(value: Optional[str]) -> Optional[dt.datetime]:
+    # CMR times are UTC, e.g. "2022-01-20T00:00:00.000Z"
+    try:
+        parsed = dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def crosses(granule: dict, boundaries: Sequence[dt.datetime]) -> bool:
+    """
+    Whether the granule's temporal extent includes one of `boundaries`, so that
+    the searches of both windows around it can return it. Granules whose
+    extent can't be read are assumed to.
+    """
+    start = _parse_time(granule.get("time_start"))
+    end = _parse_time(granule.get("time_end")) or start
+    if start is None:
+        return True
+    return any(start <= boundary <= end for boundary in boundaries)
+
+
+def search_page(
+    url: str,
+    search_after: Optional[str] = None,
+    page_size: int = PAGE_SIZE,
+    fields: Optional[Sequence[str]] = GRANULE_FIELDS,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of a CMR granule search. Returns the projected granules and the
+    search-after token of the next page, if there is one.
+    """
+    headers = {"CMR-Search-After": search_after} if search_after else {}
+    response = session.get(
+        url, params={"page_size": page_size}, headers=headers, timeout=TIMEOUT
+    )
+    response.raise_for_status()
+    entries = response.json()["feed"]["entry"]
+    next_search_after = response.headers.get("CMR-Search-After")
+    if len(entries) < page_size:
+        next_search_after = None
+    return [project(entry, fields) for entry in entries], next_search_after
+
+
+def search_granules(
+    query: Callable[[], GranuleQuery],
+    start: dt.datetime,
+    end: dt.datetime,
+    windows: int = SEARCH_CONCURRENCY,
+    max_workers: int = SEARCH_CONCURRENCY,
+    page_size: int = PAGE_SIZE,
+    fields: Optional[Sequence[str]] = GRANULE_FIELDS,
+) -> Iterator[dict]:
+    """
+    Lazily yield the granules of `query()` between `start` and `end`.
+
+    The temporal range is split into `windows` sub-ranges that are searched
+    concurrently, each paged with CMR-Search-After. At most `max_workers` pages
+    are in flight and granule records are projected to `fields` (whole records
+    are kept when it is None), so memory is bounded by the page size and the
+    number of granules on window boundaries rather than the number of granules.
+    """
+    ranges = split_temporal(start, end, windows)
+    # python-cmr is pinned, _build_url is not part of its public API
+    urls = [
+        query().temporal(window_start, window_end)._build_url()
+        for window_start, window_end in ranges
+    ]
+    boundaries = [window_end for _, window_end in ranges[:-1]]
+
+    # Granules overlapping the boundary of two windows are found in both. Only
+    # their ids are kept, so that memory doesn't grow with every granule
+    seen = set()
+    pending = deque((url, None) for url in urls)
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or in_flight:
+            while pending and len(in_flight) < max_workers:
+                url, search_after = pending.popleft()
+                future = executor.submit(
+                    search_page, url, search_after, page_size, fields
+                )
+                in_flight.append((url, future))
+            url, future = in_flight.popleft()
+            granules, search_after = future.result()
+            if search_after:
+                pending.appendleft((url, search_after))
+            for granule in granules:
+                if granule["id"] in seen:
+                    continue
+                if boundaries and crosses(granule, boundaries):
+                    seen.add(granule["id"])
+                yield granule
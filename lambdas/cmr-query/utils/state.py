@@ -0,0 +1,133 @@
+import base64
+import hashlib
+import json
+import os
+import struct
+from dataclasses import dataclass, field
+from typing import Optional, Set
+
+DISCOVERY_STATE = os.environ.get("DISCOVERY_STATE")
+
+
+def digest(*parts: str) -> int:
+    """
+    64-bit digest of an object's identity, e.g. its key and ETag.
+    """
+    h = hashlib.blake2b("\0".join(parts).encode(), digest_size=8)
+    return int.from_bytes(h.digest(), "big")
+
+
+@dataclass
+class DiscoveryState:
+    """
+    What earlier runs discovered for a collection: the digests of every object
+    (or granule) version already emitted, and a watermark such as the start
+    time of the last run. Digests are stored as 8 bytes each, so a million
+    objects take about 11 MB of base64.
+    """
+
+    watermark: Optional[str] = None
+    digests: Set[int] = field(default_factory=set)
+
+    def is_new(self, *parts: str) -> bool:
+        return digest(*parts) not in self.digests
+
+    def add(self, *parts: str) -> None:
+        self.digests.add(digest(*parts))
+
+    def to_json(self) -> str:
+        packed = struct.pack(f">{len(self.digests)}Q", *sorted(self.digests))
+        return json.dumps(
+            {
+                "watermark": self.watermark,
+                "digests": base64.b64encode(packed).decode(),
+            }
+        )
+
+    @classmethod
+    def from_json(cls, body: str) -> "DiscoveryState":
+        obj = json.loads(body)
+        packed = base64.b64decode(obj["digests"])
+        return cls(
+            watermark=obj.get("watermark"),
+            digests=set(struct.unpack(f">{len(packed) // 8}Q", packed)),
+        )
+
+
+class LocalStateBackend:
+    """
+    State files in a local directory, for tests and local runs.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def read(self, name: str) -> Optional[str]:
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return f.read()
+
+    def write(self, name: str, body: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, name), "w") as f:
+            f.write(body)
+
+
+class S3StateBackend:
+    """
+    State objects under an `s3://bucket/prefix` location.
+    """
+
+    def __init__(self, location: str, s3_client):
+        self.bucket, _, self.prefix = location[len("s3://") :].partition("/")
+        self.s3_client = s3_client
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix.rstrip('/')}/{name}".lstrip("/")
+
+    def read(self, name: str) -> Optional[str]:
+        try:
+            response = self.s3_client.get_object(
+                Bucket=self.bucket, Key=self._key(name)
+            )
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read().decode()
+
+    def write(self, name: str, body: str) -> None:
+        self.s3_client.put_object(Bucket=self.bucket, Key=self._key(name), Body=body)
+
+
+class StateStore:
+    """
+    Per-collection discovery state in a local directory or under an
+    `s3://bucket/prefix` location. `source` keeps the state of different
+    discovery lambdas apart when they share a location, and `query` (the
+    discovery parameters, e.g. bucket and prefix or temporal range) the state
+    of different discoveries of one collection, so that a new or wider query
+    starts from scratch instead of from another query's watermark.
+    """
+
+    def __init__(self, source: str, location: str, s3_client=None):
+        self.source = source
+        if location.startswith("s3://"):
+            self.backend = S3StateBackend(location, s3_client)
+        else:
+            self.backend = LocalStateBackend(location)
+
+    def name(self, collection: str, query: Optional[dict] = None) -> str:
+        name = f"{self.source}-{collection.strip('/').replace('/', '_')}"
+        if query:
+            name += f"-{digest(json.dumps(query, sort_keys=True)):016x}"
+        return f"{name}.json"
+
+    def load(self, collection: str, query: Optional[dict] = None) -> DiscoveryState:
+        body = self.backend.read(self.name(collection, query))
+        return DiscoveryState.from_json(body) if body else DiscoveryState()
+
+    def save(
+        self, collection: str, state: DiscoveryState, query: Optional[dict] = None
+    ) -> None:
+        self.backend.write(self.name(collection, query), state.to_json())
@@ -0,0 +1,250 @@
+"""
+Benchmark `handler.to_cog` over synthetic granules.
+
+Each case runs in a fresh Python process so that peak RSS is measured for that
+case alone. Results are printed as a table and can be saved as JSON, then
+compared against a saved baseline to fail on regressions:
+
+    python benchmarks/bench_to_cog.py --output baseline.json
+    python benchmarks/bench_to_cog.py --baseline baseline.json --tolerance 0.25
+"""
+import argparse
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from netCDF4 import Dataset
+
+
+COGIFY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (collection, to_cog config)
+FIXTURES = {
+    "global-0.1deg-f4": (
+        "bench-global",
+        {"variable_name": "data", "x_variable": "lon", "y_variable": "lat"},
+    ),
+    "global-0.1deg-i2": (
+        "bench-global",
+        {"variable_name": "data", "x_variable": "lon", "y_variable": "lat"},
+    ),
+    "global-0.1deg-f8": (
+        "bench-global",
+        {"variable_name": "data", "x_variable": "lon", "y_variable": "lat"},
+    ),
+    "imerg-grouped": (
+        "GPM_3IMERGM",
+        {"group": "Grid", "variable_name": "precipitation", "time_index": "0"},
+    ),
+    "hdfeos-omi": (
+        "OMDOAO3e",
+        {
+            "variable_name": "HDFEOS/GRIDS/ColumnAmountO3/Data Fields/ColumnAmountO3",
+            "affine_transformation": "(xmin, xres, 0, ymax, 0, -yres)",
+        },
+    ),
+}
+
+# name -> to_cog config overrides
+PROFILES = {
+    "in-memory": {},
+    "windowed": {"windowed": "true"},
+    "zstd": {"compress": "zstd", "level": "9", "predictor": "2"},
+    "lerc-zstd": {"compress": "lerc_zstd", "max_z_error": "0.01"},
+    "packed-int16": {"dtype": "int16", "scale_factor": "0.01"},
+}
+BLOCKSIZES = [256, 512]
+
+
+def _field(shape, dtype, rng):
+    """
+    Smooth field with noise, so compression ratios resemble real data.
+    """
+    rows, cols = np.meshgrid(
+        np.linspace(0, 4 * np.pi, shape[0]),
+        np.linspace(0, 8 * np.pi, shape[1]),
+        indexing="ij",
+    )
+    data = 100 * np.sin(rows) * np.cos(cols) + rng.normal(0, 5, shape)
+    return data.astype(dtype)
+
+
+def generate_fixture(name: str, directory: str, scale: float) -> str:
+    """
+    Write a synthetic granule shaped like a real collection, `scale` times the
+    real resolution on each axis.
+    """
+    rng = np.random.default_rng(0)
+    filename = os.path.join(directory, name)
+    with Dataset(filename, "w") as nc:
+        if name.startswith("global-0.1deg"):
+            height, width = int(1800 * scale), int(3600 * scale)
+            dtype = {"f4": "f4", "i2": "i2", "f8": "f8"}[name.rsplit("-", 1)[1]]
+            nc.createDimension("lat", height)
+            nc.createDimension("lon", width)
+            nc.createVariable("lat", "f8", ("lat",))[:] = np.linspace(90, -90, height)
+            nc.createVariable("lon", "f8", ("lon",))[:] = np.linspace(-180, 180, width)
+            variable = nc.createVariable(
+                "data", dtype, ("lat", "lon"), fill_value=-9999, zlib=True
+            )
+            variable[:] = _field((height, width), dtype, rng)
+        elif name == "imerg-grouped":
+            height, width = int(1800 * scale), int(3600 * scale)
+            group = nc.createGroup("Grid")
+            group.createDimension("time", 1)
+            group.createDimension("lon", width)
+            group.createDimension("lat", height)
+            variable = group.createVariable(
+                "precipitation",
+                "f4",
+                ("time", "lon", "lat"),
+                fill_value=-9999.9,
+                zlib=True,
+            )
+            variable[0] = _field((width, height), "f4", rng)
+        elif name == "hdfeos-omi":
+            height, width = int(720 * scale), int(1440 * scale)
+            group = nc.createGroup("HDFEOS/GRIDS/ColumnAmountO3/Data Fields")
+            group.createDimension("YDim", height)
+            group.createDimension("XDim", width)
+            variable = group.createVariable(
+                "ColumnAmountO3", "f4", ("YDim", "XDim"), fill_value=-1.0, zlib=True
+            )
+            variable[:] = _field((height, width), "f4", rng)
+        else:
+            raise ValueError(f"Unknown fixture {name}")
+    return filename
+
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one case in this process and measure it.
+    """
+    os.chdir(COGIFY_DIR)
+    sys.path.insert(0, COGIFY_DIR)
+    import handler
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    response = handler.to_cog(False, **case["config"])
+    wall_time = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    outputs = response.get("outputs", [response])
+    return {
+        "wall_time_s": round(wall_time, 3),
+        # ru_maxrss is reported in KiB on Linux
+        "peak_rss_mb": round(peak_rss / 1024, 1),
+        "peak_rss_delta_mb": round((peak_rss - baseline_rss) / 1024, 1),
+        "output_mb": round(
+            sum(os.path.getsize(o["filename"]) for o in outputs) / 1024**2, 3
+        ),
+    }
+
+
+def run_case_in_subprocess(case: Dict[str, Any]) -> Dict[str, Any]:
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(case)],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def build_cases(
+    fixtures: Dict[str, str], profiles: Dict[str, Dict], blocksizes: List[int]
+) -> List[Dict[str, Any]]:
+    cases = []
+    for (fixture, filename), (profile, overrides), blocksize in itertools.product(
+        fixtures.items(), profiles.items(), blocksizes
+    ):
+        collection, config = FIXTURES[fixture]
+        cases.append(
+            {
+                "name": f"{fixture}/{profile}/{blocksize}",
+                "config": {
+                    **config,
+                    **overrides,
+                    "collection": collection,
+                    "filename": filename,
+                    "blocksize": str(blocksize),
+                },
+            }
+        )
+    return cases
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float):
+    """
+    Return a message per metric that regressed by more than `tolerance`.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        for metric in ["wall_time_s", "peak_rss_delta_mb", "output_mb"]:
+            expected = baseline.get(name, {}).get(metric)
+            if expected and metrics[metric] > expected * (1 + tolerance):
+                regressions.append(
+                    f"{name} {metric}: {metrics[metric]} > {expected} (+{tolerance:.0%})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", nargs="+", default=list(FIXTURES))
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES))
+    parser.add_argument("--blocksizes", nargs="+", type=int, default=BLOCKSIZES)
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Grid size relative to the real collection, per axis",
+    )
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a saved JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fixtures = {
+            name: generate_fixture(name, tmp_dir, args.scale) for name in args.fixtures
+        }
+        profiles = {name: PROFILES[name] for name in args.profiles}
+
+        results = {}
+        print(f"{'case':<40} {'time (s)':>9} {'peak RSS (MB)':>14} {'output (MB)':>12}")
+        for case in build_cases(fixtures, profiles, args.blocksizes):
+            metrics = run_case_in_subprocess(case)
+            results[case["name"]] = metrics
+            print(
+                f"{case['name']:<40} {metrics['wall_time_s']:>9} "
+                f"{metrics['peak_rss_delta_mb']:>14} {metrics['output_mb']:>12}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\n".join(["Regressions:", *regressions]))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,24 @@
 import configparser
+import contextlib
 import os
-import requests
+import re
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
 
+from boto3.s3.transfer import TransferConfig
+
 import numpy as np
 
-from affine import Affine
 from netCDF4 import Dataset
 from rasterio.crs import CRS
 from rasterio.io import MemoryFile
 from rasterio.warp import calculate_default_transform
 from rio_cogeo.cogeo import cog_translate
-from rio_cogeo.profiles import cog_profiles
+
+from utils import download, encoding, grid, pool, transform, window
 
 
 config = configparser.ConfigParser()
@@ -21,23 +27,36 @@ s3 = boto3.client(
     "s3",
 )
 
-# Set COG inputs
-output_profile = cog_profiles.get(
-    "deflate"
-)  # if the files aren't uint8, this will need to be changed
-output_profile["blockxsize"] = 256
-output_profile["blockysize"] = 256
 output_bucket = config["DEFAULT"]["output_bucket"]
 output_dir = config["DEFAULT"]["output_dir"]
 
+# Validate and compile every affine_transformation spec at load time
+for section in config.sections():
+    if spec := config._sections[section].get("affine_transformation"):
+        transform.compile_transform(spec)
+
+# COGs whose uncompressed size is below this are written in memory and streamed
+# straight to S3 instead of going through /tmp
+in_memory_threshold = int(os.environ.get("COG_IN_MEMORY_THRESHOLD", 256 * 1024**2))
+transfer_config = TransferConfig(
+    multipart_chunksize=int(os.environ.get("UPLOAD_PART_SIZE", 16 * 1024**2)),
+    max_concurrency=int(os.environ.get("UPLOAD_CONCURRENCY", 10)),
+)
+
+# Georeferencing is identical for every granule of a collection variable, so it
+# is derived once and reused by warm containers (and across containers through
+# JSON sidecars when GRID_PROFILE_CACHE is a directory or s3:// prefix)
+grid_profiles = grid.GridProfileCache(os.environ.get("GRID_PROFILE_CACHE"), s3)
+
 
 def upload_file(outfilename, collection):
-    filename = outfilename.split("/tmp/")[1]
+    filename = os.path.basename(outfilename)
     try:
         s3.upload_file(
             outfilename,
             output_bucket,
             f"{collection}/{filename}",
+            Config=transfer_config,
         )
         print("File uploaded to s3")
         return f"s3://{output_bucket}/{collection}/{filename}"
@@ -46,21 +65,36 @@ def upload_file(outfilename, collection):
         raise
 
 
-def download_file(file_uri: str):
+def upload_fileobj(fileobj, filename, collection):
+    """
+    Upload an in-memory COG with parallel multipart upload.
+    """
+    try:
+        s3.upload_fileobj(
+            fileobj,
+            output_bucket,
+            f"{collection}/{filename}",
+            Config=transfer_config,
+        )
+        print("File uploaded to s3")
+        return f"s3://{output_bucket}/{collection}/{filename}"
+    except:
+        print("Failed to copy to S3 bucket")
+        raise
+
+
+def local_filename(file_uri: str):
     filename = os.path.splitext(os.path.basename(file_uri))[0]
-    filename = f"/tmp/{filename}"
+    return f"/tmp/{filename}"
+
+
+def download_file(file_uri: str):
+    filename = local_filename(file_uri)
     if "http" in file_uri:
-        # This isn't working for GPMIMERG, need to use .netrc
-        username = os.environ.get("EARTHDATA_USERNAME")
-        password = os.environ.get("EARTHDATA_PASSWORD")
-        with requests.Session() as session:
-            session.auth = (username, password)
-            request = session.request("get", file_uri)
-            response = session.get(request.url, auth=(username, password))
-            print("RESPONSE IS")
-            print(response.status_code)
-            with open(filename, "wb") as f:
-                f.write(response.content)
+        size = download.stream_download(
+            download.earthdata_session(), file_uri, filename
+        )
+        print(f"Downloaded {size} bytes to {filename}")
     elif "s3://" in file_uri:
         path_parts = file_uri.split("://")[1].split("/")
         bucket = path_parts[0]
@@ -71,29 +105,12 @@ def download_file(file_uri: str):
     return filename
 
 
-def to_cog(upload, **config):
-    """HDF5 to COG."""
-    # Open existing dataset
-    filename = str(config["filename"])
-    variable_name = config["variable_name"]
+def grid_profile(src, config, src_height, src_width) -> grid.GridProfile:
+    """
+    Derive bounds, CRS and transform of a granule from its coordinate variables.
+    """
     x_variable, y_variable = config.get("x_variable"), config.get("y_variable")
-    group = config.get("group")
-    src = Dataset(filename, "r")
-
-    if group is None:
-        variable = src[variable_name][:]
-        nodata_value = variable.fill_value
-    else:
-        variable = src.groups[group][variable_name]
-        nodata_value = variable._FillValue
-    # This may be just what we need for IMERG
-    if config["collection"] == "GPM_3IMERGM":
-        variable = np.transpose(variable[0])
-    if config["collection"] == "OMDOAO3e":
-        variable = np.flipud(variable)
-
     # This implies a global spatial extent, which is not always the case
-    src_height, src_width = variable.shape[0], variable.shape[1]
     if x_variable and y_variable:
         xmin = src[x_variable][:].min()
         xmax = src[x_variable][:].max()
@@ -125,57 +142,266 @@ def to_cog(upload, **config):
     # https://github.com/NASA-IMPACT/cloud-optimized-data-pipelines/blob/rwegener2-envi-to-cog/docker/omno2-to-cog/OMNO2d.003/handler.py
     affine_transformation = config.get("affine_transformation")
     if affine_transformation:
-        xres = (xmax - xmin) / float(src_width)
-        yres = (ymax - ymin) / float(src_height)
-        geotransform = eval(affine_transformation)
-        dst_transform = Affine.from_gdal(*geotransform)
+        dst_transform = transform.compile_transform(affine_transformation)(
+            xmin=xmin,
+            xmax=xmax,
+            ymin=ymin,
+            ymax=ymax,
+            xres=(xmax - xmin) / float(src_width),
+            yres=(ymax - ymin) / float(src_height),
+        )
+
+    return grid.GridProfile(
+        bounds=(xmin, ymin, xmax, ymax), crs=src_crs, transform=dst_transform
+    )
+
+
+def config_list(value):
+    """
+    Split a comma or newline separated config value.
+    """
+    return [item.strip() for item in re.split(r"[,\n]", value or "") if item.strip()]
+
+
+def get_variable(src, config, variable_name):
+    group = config.get("group")
+    return src.groups[group][variable_name] if group else src[variable_name]
 
-    # Save output as COG
+
+def open_variable(src, config, variable_name, time_index, windowed):
+    """
+    Open a variable in output orientation, with its nodata value.
+    """
+    # This may be just what we need for IMERG
+    transpose = config["collection"] == "GPM_3IMERGM"
+    flip = config["collection"] == "OMDOAO3e"
+
+    if windowed:
+        # Read the variable block by block rather than holding the full grid
+        variable = window.WindowedVariable(
+            get_variable(src, config, variable_name),
+            time_index=time_index,
+            transpose=transpose,
+            flip=flip,
+        )
+        return variable, variable.nodata
+
+    if config.get("group") is None:
+        variable = src[variable_name][:]
+        # The masked array only carries _FillValue when something was masked
+        nodata_value = getattr(src[variable_name], "_FillValue", variable.fill_value)
+    else:
+        variable = src.groups[config["group"]][variable_name]
+        nodata_value = variable._FillValue
+    variable = variable[:] if time_index is None else variable[time_index]
+    if transpose:
+        variable = np.transpose(variable)
+    if flip:
+        variable = np.flipud(variable)
+    return variable, nodata_value
+
+
+def write_cog(
+    upload, outfilename, bands, descriptions, profile, windowed, encoding, collection
+):
+    """
+    Write (variable, nodata) bands to a COG, uploading it when requested.
+    """
+    variables = [variable for variable, _ in bands]
+    src_height, src_width = variables[0].shape[0], variables[0].shape[1]
+    src_dtype = np.result_type(*[variable.dtype for variable in variables])
+    dtype = encoding.output_dtype(src_dtype)
+
+    # Intermediate GeoTIFF the COG is translated from
     output_profile = dict(
         driver="GTiff",
-        dtype=variable.dtype,
-        count=1,
-        transform=dst_transform,
-        crs=src_crs,
+        dtype=dtype,
+        count=len(variables),
+        transform=profile.transform,
+        crs=profile.crs,
         height=src_height,
         width=src_width,
-        nodata=nodata_value,
+        nodata=encoding.output_nodata(bands[0][1], src_dtype),
         tiled=True,
         compress="deflate",
-        blockxsize=256,
-        blockysize=256,
+        blockxsize=encoding.blocksize,
+        blockysize=encoding.blocksize,
     )
     print("profile h/w: ", output_profile["height"], output_profile["width"])
-    outfilename = f"{filename}.tif"
-    with MemoryFile() as memfile:
-        with memfile.open(**output_profile) as mem:
-            data = variable.astype(np.float32)
-            mem.write(data, indexes=1)
-        cog_translate(
-            memfile,
-            outfilename,
-            output_profile,
-            config=dict(GDAL_NUM_THREADS="ALL_CPUS", GDAL_TIFF_OVR_BLOCKSIZE="128"),
-        )
-    return_obj = {
-        "filename": outfilename,
-    }
-    if upload:
-        s3location = upload_file(outfilename, config["collection"])
-        return_obj["s3_filename"] = s3location
+    cog_kwargs = dict(
+        overview_level=encoding.overview_level,
+        overview_resampling=encoding.overview_resampling,
+        config=dict(GDAL_NUM_THREADS="ALL_CPUS", GDAL_TIFF_OVR_BLOCKSIZE="128"),
+    )
+    raw_size = len(variables) * src_height * src_width * dtype.itemsize
+    in_memory_output = upload and raw_size <= in_memory_threshold
+    return_obj = {}
+    with contextlib.ExitStack() as stack:
+        if in_memory_output:
+            dst = stack.enter_context(MemoryFile())
+            dst_path = dst.name
+        else:
+            dst_path = outfilename
+            return_obj["filename"] = outfilename
+
+        if windowed:
+            tmp_dir = stack.enter_context(tempfile.TemporaryDirectory())
+            tmp_filename = os.path.join(tmp_dir, "windowed.tif")
+            window.write_bands(
+                tmp_filename, output_profile, variables, encoding, descriptions
+            )
+            cog_translate(
+                tmp_filename,
+                dst_path,
+                encoding.creation_options(),
+                in_memory=False,
+                **cog_kwargs,
+            )
+        else:
+            with MemoryFile() as memfile:
+                with memfile.open(**output_profile) as mem:
+                    encoding.tag(mem)
+                    for band, (variable, nodata) in enumerate(bands, start=1):
+                        data = encoding.encode(variable, nodata, variable.dtype)
+                        mem.write(data, indexes=band)
+                        if descriptions:
+                            mem.set_band_description(band, descriptions[band - 1])
+                cog_translate(
+                    memfile, dst_path, encoding.creation_options(), **cog_kwargs
+                )
+
+        if in_memory_output:
+            return_obj["s3_filename"] = upload_fileobj(
+                dst, os.path.basename(outfilename), collection
+            )
+        elif upload:
+            return_obj["s3_filename"] = upload_file(outfilename, collection)
 
     return return_obj
 
 
+def to_cog(upload, **config):
+    """
+    HDF5 to COG.
+
+    `variable_name` may list several variables and `time_index` several steps of
+    3-D variables. Each (variable, time index) pair becomes its own COG, or a
+    band of a single COG with `output = bands`. Outputs are encoded in parallel
+    from the one open granule, by at most one thread per available CPU.
+    """
+    # Open existing dataset
+    filename = str(config["filename"])
+    variable_names = config_list(config["variable_name"])
+    time_indexes = [int(i) for i in config_list(config.get("time_index"))]
+    windowed = config.get("windowed", "false").lower() in ("true", "yes", "1")
+    multiband = config.get("output", "files") == "bands"
+    cog_encoding = encoding.Encoding.from_config(config)
+    settings = grid.grid_settings(config)
+    # Granules read from their own coordinate variables can each cover a
+    # different footprint, so their grid is only cached when asked to
+    per_granule_grid = bool(config.get("x_variable") and config.get("y_variable"))
+    cache_grid = config.get(
+        "cache_grid", "false" if per_granule_grid else "true"
+    ).lower() in ("true", "yes", "1")
+
+    src = Dataset(filename, "r")
+    try:
+        band_keys = []
+        for name in variable_names:
+            # Time indexes only apply to variables with a leading time axis
+            if time_indexes and get_variable(src, config, name).ndim > 2:
+                band_keys.extend((name, time_index) for time_index in time_indexes)
+            else:
+                band_keys.append((name, None))
+
+        if multiband:
+            outputs = [("", band_keys)]
+        else:
+            outputs = []
+            for name, time_index in band_keys:
+                suffix = ""
+                if len(variable_names) > 1:
+                    suffix += "_" + name.rsplit("/", 1)[-1].replace(" ", "_")
+                if len(time_indexes) > 1 and time_index is not None:
+                    suffix += f"_t{time_index}"
+                outputs.append((suffix, [(name, time_index)]))
+
+        def convert(suffix, keys):
+            # Bands are opened by the job writing them, so that at most one
+            # output per worker is held in memory. HDF5 reads and the grid
+            # cache are serialized by the read lock.
+            with window.read_lock:
+                bands = [
+                    open_variable(src, config, name, time_index, windowed)
+                    for name, time_index in keys
+                ]
+                src_height, src_width = bands[0][0].shape[0], bands[0][0].shape[1]
+                shape = (src_height, src_width)
+                variable_name = keys[0][0]
+                if cache_grid:
+                    profile = grid_profiles.get(
+                        config["collection"], variable_name, shape, settings
+                    )
+                    if profile is None:
+                        profile = grid_profile(src, config, src_height, src_width)
+                        grid_profiles.put(
+                            config["collection"],
+                            variable_name,
+                            shape,
+                            profile,
+                            settings,
+                        )
+                else:
+                    profile = grid_profile(src, config, src_height, src_width)
+            descriptions = [
+                name if time_index is None else f"{name}[{time_index}]"
+                for name, time_index in keys
+            ]
+            return write_cog(
+                upload=upload,
+                outfilename=f"{filename}{suffix}.tif",
+                bands=bands,
+                descriptions=descriptions if len(keys) > 1 else None,
+                profile=profile,
+                windowed=windowed,
+                encoding=cog_encoding,
+                collection=config["collection"],
+            )
+
+        # Bounded by the CPUs, as each cog_translate is multithreaded itself
+        max_workers = min(len(outputs), pool.available_cpus())
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(lambda output: convert(*output), outputs))
+    finally:
+        src.close()
+
+    if len(results) == 1:
+        return results[0]
+    return {
+        "outputs": [
+            {"variable_name": keys[0][0], "time_index": keys[0][1], **result}
+            for (_, keys), result in zip(outputs, results)
+        ]
+    }
+
+
+# Event keys passed on to build-stac
+PASSTHROUGH_KEYS = ("cmr_metadata", "raster_metadata")
+
+
 def handler(event, context):
     filename = event["href"]
     collection = event["collection"]
-    to_cog_config = config._sections[collection]
+    # Copy so the per-granule keys don't leak into the shared parsed config
+    to_cog_config = dict(config._sections[collection])
     downloaded_filename = download_file(file_uri=filename)
     to_cog_config["filename"] = downloaded_filename
     to_cog_config["collection"] = collection
 
     return_obj = {"granule_id": event["granule_id"], "collection": event["collection"]}
+    for key in PASSTHROUGH_KEYS:
+        if key in event:
+            return_obj[key] = event[key]
 
     output_locations = to_cog(upload=event.get("upload", False), **to_cog_config)
 
@@ -185,6 +411,49 @@ def handler(event, context):
     return return_obj
 
 
+def convert_granule(event):
+    """
+    Run `handler` for one granule of a batch, removing the downloaded granule
+    and the COGs from /tmp once uploaded so a long batch doesn't fill the disk.
+    """
+    return_obj = handler(event, None)
+    if event.get("upload") and ("http" in event["href"] or "s3://" in event["href"]):
+        outputs = [return_obj, *return_obj.get("outputs", [])]
+        filenames = [output["filename"] for output in outputs if "filename" in output]
+        for filename in [local_filename(event["href"]), *filenames]:
+            if os.path.exists(filename):
+                os.remove(filename)
+    return return_obj
+
+
+def batch_handler(event, context):
+    """
+    Convert a list of granule events in one invocation.
+
+    Granules are converted concurrently in child processes. By default one more
+    process than there are vCPUs is used so that a granule can be downloading
+    while the others are encoding. A failed granule is reported in `failures`
+    and does not stop the rest of the batch.
+
+    Arguments:
+    event - a list of `handler` events, or an object with the list under "objects"
+    """
+    objects = event["objects"] if isinstance(event, dict) else event
+    max_workers = int(os.environ.get("BATCH_WORKERS", pool.available_cpus() + 1))
+
+    results, failures = [], []
+    for granule, result, error in pool.process_map(
+        convert_granule, objects, max_workers=max_workers
+    ):
+        if error:
+            failures.append({**granule, "error": error})
+        else:
+            results.append(result)
+
+    print(f"Converted {len(results)} granules, {len(failures)} failed")
+    return {"objects": results, "failures": failures}
+
+
 if __name__ == "__main__":
     sample_event = {
         "collection": "OMDOAO3e",
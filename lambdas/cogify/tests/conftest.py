@@ -0,0 +1,93 @@
+import os
+from unittest.mock import patch
+
+import boto3
+import numpy as np
+import pytest
+from moto import mock_s3
+from netCDF4 import Dataset
+
+import handler
+
+
+@pytest.fixture
+def grid():
+    return np.random.default_rng(0).random((300, 600), dtype=np.float32)
+
+
+@pytest.fixture
+def hdfeos_granule(tmp_path, grid):
+    """
+    Granule shaped like OMDOAO3e, with the variable in an HDF-EOS group path.
+    """
+    filename = str(tmp_path / "OMDOAO3e")
+    with Dataset(filename, "w") as nc:
+        group = nc.createGroup("HDFEOS/GRIDS/ColumnAmountO3/Data Fields")
+        group.createDimension("y", grid.shape[0])
+        group.createDimension("x", grid.shape[1])
+        variable = group.createVariable(
+            "ColumnAmountO3", "f4", ("y", "x"), fill_value=-1.0
+        )
+        variable[:] = grid
+    return filename
+
+
+@pytest.fixture
+def imerg_granule(tmp_path, grid):
+    """
+    Granule shaped like GPM_3IMERGM, with a (time, lon, lat) variable in a group.
+    """
+    filename = str(tmp_path / "GPM_3IMERGM")
+    with Dataset(filename, "w") as nc:
+        group = nc.createGroup("Grid")
+        group.createDimension("time", 1)
+        group.createDimension("lon", grid.shape[1])
+        group.createDimension("lat", grid.shape[0])
+        variable = group.createVariable(
+            "precipitation", "f4", ("time", "lon", "lat"), fill_value=-9999.9
+        )
+        variable[0] = grid.T
+    return filename
+
+
+@pytest.fixture
+def packed_granule(tmp_path, grid):
+    """
+    Granule shaped like ERA5, with a (time, y, x) int16 variable packed with
+    scale_factor and add_offset.
+    """
+    filename = str(tmp_path / "ERA5")
+    with Dataset(filename, "w") as nc:
+        nc.createDimension("time", 1)
+        nc.createDimension("y", grid.shape[0])
+        nc.createDimension("x", grid.shape[1])
+        variable = nc.createVariable("t2m", "i2", ("time", "y", "x"), fill_value=-32767)
+        variable.scale_factor = 0.1
+        variable.add_offset = 250.0
+        data = np.ma.masked_array(250.0 + 100.0 * grid, mask=grid < 0.01)
+        variable[0] = data
+    return filename
+
+
+@pytest.fixture
+def aws_credentials():
+    """Mocked AWS Credentials for moto."""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+
+@pytest.fixture
+def s3_client(aws_credentials):
+    with mock_s3():
+        client = boto3.client("s3", region_name="us-east-1")
+        with patch.object(handler, "s3", client):
+            yield client
+
+
+@pytest.fixture
+def output_bucket(s3_client):
+    s3_client.create_bucket(Bucket=handler.output_bucket)
+    yield handler.output_bucket
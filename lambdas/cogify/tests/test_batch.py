@@ -0,0 +1,70 @@
+from unittest.mock import patch
+
+import handler
+
+from utils import pool
+
+
+def test_process_map_reports_failures():
+    """
+    Ensure every item is yielded once, with errors instead of results on failure.
+    """
+    results = {
+        item: (result, error)
+        for item, result, error in pool.process_map(
+            lambda x: 10 // x, [1, 2, 0, 5], max_workers=2
+        )
+    }
+
+    assert results[1] == (10, None)
+    assert results[5] == (2, None)
+    assert results[0] == (None, "ZeroDivisionError: integer division or modulo by zero")
+
+
+def test_batch_handler(hdfeos_granule):
+    """
+    Ensure a batch returns per-granule results and per-granule failures.
+    """
+    good_event = {
+        "collection": "OMDOAO3e",
+        "href": hdfeos_granule,
+        "granule_id": "G1-TEST",
+    }
+    bad_event = {
+        "collection": "not-configured",
+        "href": hdfeos_granule,
+        "granule_id": "G2-TEST",
+    }
+
+    with patch.object(handler, "download_file", side_effect=lambda file_uri: file_uri):
+        response = handler.batch_handler({"objects": [good_event, bad_event]}, None)
+
+    assert response["objects"] == [
+        {
+            "granule_id": "G1-TEST",
+            "collection": "OMDOAO3e",
+            "filename": f"{hdfeos_granule}.tif",
+        }
+    ]
+    assert response["failures"] == [
+        {**bad_event, "error": "KeyError: 'not-configured'"}
+    ]
+
+
+def test_handler_passes_build_stac_keys(hdfeos_granule):
+    """
+    Ensure keys meant for build-stac survive cogify.
+    """
+    event = {
+        "collection": "OMDOAO3e",
+        "href": hdfeos_granule,
+        "granule_id": "G1-TEST",
+        "cmr_metadata": {"time_start": "2022-01-01T00:00:00.000Z"},
+        "raster_metadata": "header",
+    }
+
+    with patch.object(handler, "download_file", side_effect=lambda file_uri: file_uri):
+        response = handler.handler(event, None)
+
+    assert response["cmr_metadata"] == event["cmr_metadata"]
+    assert response["raster_metadata"] == "header"
@@ -0,0 +1,158 @@
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from utils import download
+
+
+class MockResponse:
+    def __init__(self, status_code, chunks, fail_after=None):
+        self.url = "https://example.com/granule.nc"
+        self.history = []
+        self.status_code = status_code
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(response=self)
+
+    def iter_content(self, chunk_size):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise requests.exceptions.ChunkedEncodingError("connection dropped")
+            yield chunk
+
+
+class MockSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(headers)
+        return self.responses.pop(0)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    with patch.object(download.time, "sleep"):
+        yield
+
+
+def test_stream_download(tmp_path):
+    """
+    Ensure the body is written to disk chunk by chunk.
+    """
+    session = MockSession(MockResponse(200, [b"abc", b"def"]))
+    filename = tmp_path / "granule.nc"
+
+    size = download.stream_download(session, "https://example.com", filename)
+
+    assert size == 6
+    assert filename.read_bytes() == b"abcdef"
+    assert session.requests == [{}]
+
+
+def test_stream_download_resumes_with_range(tmp_path):
+    """
+    Ensure a dropped connection resumes from the last byte written.
+    """
+    session = MockSession(
+        MockResponse(200, [b"abc", b"def"], fail_after=1),
+        MockResponse(206, [b"def"]),
+    )
+    filename = tmp_path / "granule.nc"
+
+    size = download.stream_download(session, "https://example.com", filename)
+
+    assert size == 6
+    assert filename.read_bytes() == b"abcdef"
+    assert session.requests == [{}, {"Range": "bytes=3-"}]
+
+
+def test_stream_download_restarts_without_range_support(tmp_path):
+    """
+    Ensure the file is rewritten when the server ignores the Range header.
+    """
+    session = MockSession(
+        MockResponse(200, [b"abc", b"def"], fail_after=1),
+        MockResponse(200, [b"abc", b"def"]),
+    )
+    filename = tmp_path / "granule.nc"
+
+    size = download.stream_download(session, "https://example.com", filename)
+
+    assert size == 6
+    assert filename.read_bytes() == b"abcdef"
+
+
+def test_stream_download_retries_server_errors(tmp_path):
+    """
+    Ensure retryable status codes are retried and others are raised.
+    """
+    session = MockSession(MockResponse(503, []), MockResponse(200, [b"abc"]))
+    filename = tmp_path / "granule.nc"
+    assert download.stream_download(session, "https://example.com", filename) == 3
+
+    session = MockSession(MockResponse(404, []))
+    with pytest.raises(requests.HTTPError):
+        download.stream_download(session, "https://example.com", filename)
+
+
+def test_stream_download_gives_up(tmp_path):
+    """
+    Ensure the error is raised once retries are exhausted.
+    """
+    session = MockSession(*[MockResponse(503, []) for _ in range(3)])
+    with pytest.raises(requests.HTTPError):
+        download.stream_download(
+            session, "https://example.com", tmp_path / "granule.nc", max_retries=2
+        )
+
+
+@pytest.mark.parametrize(
+    "original,redirect,keeps_auth",
+    [
+        ("https://data.gesdisc.nasa.gov/a", "https://urs.earthdata.nasa.gov/b", True),
+        ("https://urs.earthdata.nasa.gov/b", "https://data.gesdisc.nasa.gov/a", True),
+        ("https://data.gesdisc.nasa.gov/a", "https://data.gesdisc.nasa.gov/c", True),
+        ("https://data.gesdisc.nasa.gov/a", "https://example.com/c", False),
+        ("https://data.gesdisc.nasa.gov/a", "http://data.gesdisc.nasa.gov/c", False),
+        ("https://urs.earthdata.nasa.gov/b", "http://data.gesdisc.nasa.gov/a", False),
+        (
+            "https://data.gesdisc.nasa.gov/a",
+            "https://urs.earthdata.nasa.gov:8443/b",
+            False,
+        ),
+    ],
+)
+def test_earthdata_session_auth(original, redirect, keeps_auth):
+    """
+    Ensure credentials follow redirects to and from Earthdata Login only, and
+    never onto plain http.
+    """
+    session = download.EarthdataSession()
+    response = requests.Response()
+    response.request = requests.Request("GET", original).prepare()
+    prepared = requests.Request(
+        "GET", redirect, headers={"Authorization": "Basic xxx"}
+    ).prepare()
+
+    session.rebuild_auth(prepared, response)
+
+    assert ("Authorization" in prepared.headers) == keeps_auth
+
+
+def test_earthdata_session_is_shared():
+    """
+    Ensure warm invocations reuse the same session and its cookies.
+    """
+    assert download.earthdata_session() is download.earthdata_session()
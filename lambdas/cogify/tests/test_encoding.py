@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+import rasterio
+
+import handler
+from utils.encoding import Encoding
+
+
+def test_creation_options():
+    """
+    Ensure codec, level and predictor settings become GDAL creation options.
+    """
+    encoding = Encoding.from_config(
+        {"compress": "ZSTD", "level": "9", "predictor": "2", "blocksize": "512"}
+    )
+
+    options = encoding.creation_options()
+
+    assert options["compress"].upper() == "ZSTD"
+    assert options["zstd_level"] == 9
+    assert options["predictor"] == 2
+    assert options["blockxsize"] == options["blockysize"] == 512
+
+
+def test_unknown_compression():
+    """
+    Ensure an unknown codec fails before any data is read.
+    """
+    with pytest.raises(ValueError):
+        Encoding.from_config({"compress": "zip"})
+
+
+def test_encode_packed():
+    """
+    Ensure packed values round trip within the scale factor and masked pixels
+    become the output nodata.
+    """
+    encoding = Encoding(dtype="int16", scale_factor=0.01, add_offset=100)
+    data = np.ma.masked_array([[100.0, 101.234], [-9999.0, 99.5]], mask=False)
+    data.mask[1, 0] = True
+
+    encoded = encoding.encode(data, -9999.0, data.dtype)
+
+    assert encoded.dtype == np.int16
+    assert encoded[1, 0] == encoding.output_nodata(-9999.0, data.dtype)
+    np.testing.assert_allclose(
+        encoded[[0, 0, 1], [0, 1, 1]] * 0.01 + 100, [100.0, 101.23, 99.5]
+    )
+
+
+@pytest.mark.parametrize("windowed", ["false", "true"])
+def test_to_cog_encoding(hdfeos_granule, windowed):
+    """
+    Ensure the configured encoding reaches the COG, with packing recorded as
+    band scales and offsets.
+    """
+    response = handler.to_cog(
+        False,
+        filename=hdfeos_granule,
+        collection="OMDOAO3e",
+        variable_name="HDFEOS/GRIDS/ColumnAmountO3/Data Fields/ColumnAmountO3",
+        windowed=windowed,
+        compress="zstd",
+        dtype="int16",
+        scale_factor="0.1",
+    )
+
+    with rasterio.open(response["filename"]) as cog:
+        assert cog.dtypes[0] == "int16"
+        assert cog.compression.name.upper() == "ZSTD"
+        assert cog.scales == (0.1,)
+        assert cog.offsets == (0.0,)
+
+
+def test_to_cog_keeps_dtype(hdfeos_granule):
+    """
+    Ensure the variable's dtype is kept when no dtype is configured.
+    """
+    response = handler.to_cog(
+        False,
+        filename=hdfeos_granule,
+        collection="OMDOAO3e",
+        variable_name="HDFEOS/GRIDS/ColumnAmountO3/Data Fields/ColumnAmountO3",
+    )
+
+    with rasterio.open(response["filename"]) as cog:
+        assert cog.dtypes[0] == "float32"
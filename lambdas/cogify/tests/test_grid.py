@@ -0,0 +1,122 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import rasterio
+from affine import Affine
+from netCDF4 import Dataset
+from rasterio.crs import CRS
+
+import handler
+
+from utils import grid
+
+
+PROFILE = grid.GridProfile(
+    bounds=(-180.0, -90.0, 180.0, 90.0),
+    crs=CRS.from_epsg(4326),
+    transform=Affine.from_gdal(-180.0, 0.6, 0.0, 90.0, 0.0, -0.6),
+)
+
+
+def test_profile_roundtrip():
+    """
+    Ensure a grid profile survives JSON serialization.
+    """
+    assert grid.GridProfile.from_dict(PROFILE.to_dict()) == PROFILE
+
+
+def test_local_sidecar(tmp_path):
+    """
+    Ensure profiles persisted to a directory are found by a fresh cache.
+    """
+    grid.GridProfileCache(str(tmp_path)).put("OMNO2d", "a/b c", (300, 600), PROFILE)
+
+    cache = grid.GridProfileCache(str(tmp_path))
+    assert cache.get("OMNO2d", "a/b c", (300, 600)) == PROFILE
+    assert cache.get("OMNO2d", "a/b c", (600, 300)) is None
+
+
+def test_s3_sidecar(s3_client):
+    """
+    Ensure profiles persisted to S3 are found by a fresh cache.
+    """
+    s3_client.create_bucket(Bucket="cache-bucket")
+    location = "s3://cache-bucket/grid-profiles/"
+
+    grid.GridProfileCache(location, s3_client).put("OMNO2d", "x", (1, 2), PROFILE)
+
+    cache = grid.GridProfileCache(location, s3_client)
+    assert cache.get("OMNO2d", "x", (1, 2)) == PROFILE
+    assert cache.get("OMNO2d", "x", (2, 1)) is None
+
+
+@pytest.mark.parametrize("windowed", ["false", "true"])
+def test_to_cog_reuses_grid_profile(hdfeos_granule, windowed):
+    """
+    Ensure georeferencing is derived only once per collection variable and shape.
+    """
+    with patch.object(handler, "grid_profiles", grid.GridProfileCache()), patch.object(
+        handler, "grid_profile", wraps=handler.grid_profile
+    ) as grid_profile:
+        for _ in range(3):
+            handler.to_cog(
+                False,
+                filename=hdfeos_granule,
+                collection="OMDOAO3e",
+                variable_name="HDFEOS/GRIDS/ColumnAmountO3/Data Fields/ColumnAmountO3",
+                windowed=windowed,
+            )
+
+    assert grid_profile.call_count == 1
+
+
+def test_settings_in_key():
+    """
+    Ensure editing a section's georeferencing settings invalidates its profiles.
+    """
+    cache = grid.GridProfileCache()
+    settings = {
+        "src_crs": None,
+        "affine_transformation": "(xmin, xres, 0, ymax, 0, -yres)",
+    }
+    cache.put("OMNO2d", "x", (1, 2), PROFILE, settings)
+
+    assert cache.get("OMNO2d", "x", (1, 2), settings) == PROFILE
+    assert (
+        cache.get("OMNO2d", "x", (1, 2), {**settings, "src_crs": "+proj=utm"}) is None
+    )
+
+
+def coordinates_granule(path, grid, xmin, ymin):
+    """
+    Granule with its own lon/lat coordinate variables, like NISAR GCOV.
+    """
+    with Dataset(path, "w") as nc:
+        nc.createDimension("y", grid.shape[0])
+        nc.createDimension("x", grid.shape[1])
+        nc.createVariable("lon", "f8", ("x",))[:] = xmin + np.arange(grid.shape[1])
+        nc.createVariable("lat", "f8", ("y",))[:] = ymin + np.arange(grid.shape[0])
+        nc.createVariable("data", "f4", ("y", "x"), fill_value=-1.0)[:] = grid
+    return str(path)
+
+
+def test_per_granule_coordinates_not_cached(tmp_path, grid):
+    """
+    Ensure granules with their own coordinates keep their own footprint.
+    """
+    granules = [
+        coordinates_granule(tmp_path / "a", grid, -170, -80),
+        coordinates_granule(tmp_path / "b", grid, 10, 20),
+    ]
+    config = dict(collection="NISAR", variable_name="data", x_variable="lon")
+    config["y_variable"] = "lat"
+
+    bounds = []
+    with patch.object(handler, "grid_profiles", handler.grid.GridProfileCache()):
+        for granule in granules:
+            output = handler.to_cog(False, filename=granule, **config)
+            with rasterio.open(output["filename"]) as src:
+                bounds.append(src.bounds)
+
+    assert bounds[0] != bounds[1]
@@ -0,0 +1,174 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import rasterio
+
+from netCDF4 import Dataset
+
+import handler
+
+
+def read_cog(filename):
+    with rasterio.open(filename) as cog:
+        return cog.read(1), cog.profile
+
+
+@pytest.mark.parametrize(
+    "granule,config",
+    [
+        (
+            "hdfeos_granule",
+            {
+                "collection": "OMDOAO3e",
+                "variable_name": "HDFEOS/GRIDS/ColumnAmountO3/Data Fields/ColumnAmountO3",
+            },
+        ),
+        (
+            "imerg_granule",
+            {
+                "collection": "GPM_3IMERGM",
+                "group": "Grid",
+                "variable_name": "precipitation",
+                "time_index": "0",
+            },
+        ),
+        (
+            "packed_granule",
+            {
+                "collection": "ERA5",
+                "variable_name": "t2m",
+                "time_index": "0",
+            },
+        ),
+    ],
+)
+def test_windowed_matches_in_memory(request, granule, config):
+    """
+    Ensure windowed conversion produces the same COG as the in-memory path.
+    """
+    filename = request.getfixturevalue(granule)
+
+    expected = read_cog(handler.to_cog(False, filename=filename, **config)["filename"])
+    actual = read_cog(
+        handler.to_cog(False, filename=filename, windowed="true", **config)["filename"]
+    )
+
+    np.testing.assert_array_equal(actual[0], expected[0])
+    assert actual[1] == expected[1]
+
+
+@pytest.mark.parametrize("threshold,on_disk", [(2**30, False), (0, True)])
+def test_upload(hdfeos_granule, output_bucket, s3_client, threshold, on_disk):
+    """
+    Ensure small COGs are streamed to S3 from memory and large ones from /tmp.
+    """
+    with patch.object(handler, "in_memory_threshold", threshold):
+        response = handler.to_cog(
+            True,
+            filename=hdfeos_granule,
+            collection="OMDOAO3e",
+            variable_name="HDFEOS/GRIDS/ColumnAmountO3/Data Fields/ColumnAmountO3",
+        )
+
+    key = "OMDOAO3e/OMDOAO3e.tif"
+    assert response["s3_filename"] == f"s3://{output_bucket}/{key}"
+    assert ("filename" in response) == on_disk
+    body = s3_client.get_object(Bucket=output_bucket, Key=key)["Body"].read()
+    assert body[:4] == b"II*\x00"
+
+
+@pytest.fixture
+def multi_variable_granule(tmp_path, grid):
+    """
+    Granule with a 2-D variable and a (time, y, x) variable.
+    """
+    filename = str(tmp_path / "multi")
+    with Dataset(filename, "w") as nc:
+        nc.createDimension("time", 2)
+        nc.createDimension("y", grid.shape[0])
+        nc.createDimension("x", grid.shape[1])
+        nc.createVariable("a", "f4", ("y", "x"), fill_value=-1.0)[:] = grid
+        series = nc.createVariable("b", "f4", ("time", "y", "x"), fill_value=-1.0)
+        series[0] = grid * 2
+        series[1] = grid * 3
+    return filename
+
+
+@pytest.mark.parametrize("windowed", ["false", "true"])
+def test_multiple_files(multi_variable_granule, grid, windowed):
+    """
+    Ensure each variable and time step is written to its own COG.
+    """
+    response = handler.to_cog(
+        False,
+        filename=multi_variable_granule,
+        collection="test",
+        variable_name="b",
+        time_index="0, 1",
+        windowed=windowed,
+    )
+
+    assert [(o["variable_name"], o["time_index"]) for o in response["outputs"]] == [
+        ("b", 0),
+        ("b", 1),
+    ]
+    for output, factor in zip(response["outputs"], [2, 3]):
+        assert output["filename"].endswith(f"_t{output['time_index']}.tif")
+        np.testing.assert_allclose(read_cog(output["filename"])[0], grid * factor)
+
+
+@pytest.mark.parametrize("windowed", ["false", "true"])
+def test_multiple_bands(multi_variable_granule, grid, windowed):
+    """
+    Ensure variables can be combined as the bands of a single COG.
+    """
+    response = handler.to_cog(
+        False,
+        filename=multi_variable_granule,
+        collection="test",
+        variable_name="a,\nb",
+        time_index="1",
+        output="bands",
+        windowed=windowed,
+    )
+
+    assert response == {"filename": f"{multi_variable_granule}.tif"}
+    with rasterio.open(response["filename"]) as cog:
+        assert cog.count == 2
+        assert cog.descriptions == ("a", "b[1]")
+        np.testing.assert_allclose(cog.read(1), grid)
+        np.testing.assert_allclose(cog.read(2), grid * 3)
+
+
+@pytest.mark.parametrize("windowed", ["false", "true"])
+def test_outputs_bounded_by_cpus(multi_variable_granule, grid, windowed):
+    """
+    Ensure outputs run in at most one thread per CPU, each opening its own
+    bands, so that only the outputs being written are held in memory.
+    """
+    calls = []
+    open_variable, write_cog = handler.open_variable, handler.write_cog
+
+    def record_open(*args):
+        calls.append("open")
+        return open_variable(*args)
+
+    def record_write(**kwargs):
+        calls.append("write")
+        return write_cog(**kwargs)
+
+    with patch.object(handler.pool, "available_cpus", return_value=1), patch.object(
+        handler, "open_variable", side_effect=record_open
+    ), patch.object(handler, "write_cog", side_effect=record_write):
+        response = handler.to_cog(
+            False,
+            filename=multi_variable_granule,
+            collection="test",
+            variable_name="a, b",
+            time_index="0, 1",
+            windowed=windowed,
+        )
+
+    assert len(response["outputs"]) == 3
+    assert calls == ["open", "write"] * 3
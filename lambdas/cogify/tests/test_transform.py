@@ -0,0 +1,77 @@
+import pytest
+from affine import Affine
+
+import handler
+
+from utils import transform
+
+
+GRID = dict(xmin=-180.0, xmax=180.0, ymin=-90.0, ymax=90.0, xres=0.25, yres=0.25)
+
+
+@pytest.mark.parametrize("section", handler.config.sections())
+def test_example_config_sections(section):
+    """
+    Ensure every collection section in example.ini has a valid configuration.
+    """
+    to_cog_config = handler.config._sections[section]
+    assert to_cog_config["variable_name"]
+
+    if spec := to_cog_config.get("affine_transformation"):
+        # Same result as the eval() based implementation it replaces
+        assert transform.compile_transform(spec)(**GRID) == Affine.from_gdal(
+            *eval(spec, {}, dict(GRID))
+        )
+
+
+@pytest.mark.parametrize("section", ["OMNO2d", "OMDOAO3e"])
+def test_omi_transform(section):
+    """
+    Ensure OMI grids are georeferenced from their upper left corner.
+    """
+    spec = handler.config._sections[section]["affine_transformation"]
+    assert transform.compile_transform(spec)(**GRID) == Affine(
+        0.25, 0, -180.0, 0, -0.25, 90.0
+    )
+
+
+@pytest.mark.parametrize(
+    "spec,expected",
+    [
+        ("(xmin, xres, 0, ymax, 0, -yres)", (-180, 0.25, 0, 90, 0, -0.25)),
+        (
+            "(xmin + xres / 2, xres, 0, ymax, 0, -yres)",
+            (-179.875, 0.25, 0, 90, 0, -0.25),
+        ),
+        (
+            "(-180, (xmax - xmin) / 1440, 0, 90.0, 0, -1 * yres)",
+            (-180, 0.25, 0, 90, 0, -0.25),
+        ),
+    ],
+)
+def test_compile_transform(spec, expected):
+    """
+    Ensure arithmetic over the grid symbols is evaluated.
+    """
+    assert transform.compile_transform(spec)(**GRID) == Affine.from_gdal(*expected)
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        "(xmin, xres, 0, ymax, 0)",
+        "xmin, xres, 0, ymax, 0, -yres, 1",
+        "(xmin, xres, 0, ymax, 0, -zres)",
+        "(xmin, xres, 0, ymax, 0, __import__('os').getpid())",
+        "(xmin, xres, 0, ymax, 0, yres.real)",
+        "(xmin, xres, 0, ymax, 0, yres ** 2)",
+        "(xmin, xres, 0, ymax, 0, 'yres')",
+        "(xmin, xres, 0, ymax, 0,",
+    ],
+)
+def test_invalid_transform(spec):
+    """
+    Ensure anything but arithmetic over the grid symbols is rejected.
+    """
+    with pytest.raises(transform.TransformSpecError):
+        transform.compile_transform(spec)
@@ -0,0 +1,130 @@
+import os
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+CHUNK_SIZE = int(os.environ.get("DOWNLOAD_CHUNK_SIZE", 8 * 1024 * 1024))
+MAX_RETRIES = int(os.environ.get("DOWNLOAD_MAX_RETRIES", 5))
+BACKOFF_FACTOR = float(os.environ.get("DOWNLOAD_BACKOFF_FACTOR", 1))
+TIMEOUT = float(os.environ.get("DOWNLOAD_TIMEOUT", 60))
+POOL_SIZE = int(os.environ.get("DOWNLOAD_POOL_SIZE", 10))
+
+EARTHDATA_LOGIN_HOST = "urs.earthdata.nasa.gov"
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and (
+            error.response.status_code in RETRYABLE_STATUS_CODES
+        )
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+class EarthdataSession(requests.Session):
+    """
+    Session that keeps its credentials when redirected to and from Earthdata
+    Login. requests drops the Authorization header on any cross-host redirect,
+    which otherwise forces a second request to complete the login.
+    """
+
+    def should_strip_auth(self, old_url, new_url):
+        old, new = urlparse(old_url), urlparse(new_url)
+        if (
+            new.scheme == "https"
+            and old.hostname != new.hostname
+            and EARTHDATA_LOGIN_HOST in (old.hostname, new.hostname)
+        ):
+            # Judge the redirect as if it stayed on the original host, so that
+            # scheme and port changes still strip the credentials
+            port = f":{new.port}" if new.port else ""
+            new_url = new._replace(netloc=f"{old.hostname}{port}").geturl()
+        return super().should_strip_auth(old_url, new_url)
+
+
+_session: Optional[EarthdataSession] = None
+
+
+def earthdata_session() -> EarthdataSession:
+    """
+    Session shared by every download in the container. Keeping it at module
+    level lets warm invocations reuse pooled TLS connections and the Earthdata
+    Login cookies set by earlier downloads.
+    """
+    global _session
+    if _session is None:
+        _session = EarthdataSession()
+        _session.auth = (
+            os.environ.get("EARTHDATA_USERNAME"),
+            os.environ.get("EARTHDATA_PASSWORD"),
+        )
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+
+def stream_download(
+    session: requests.Session,
+    url: str,
+    filename: str,
+    chunk_size: int = CHUNK_SIZE,
+    max_retries: int = MAX_RETRIES,
+    backoff_factor: float = BACKOFF_FACTOR,
+) -> int:
+    """
+    Stream `url` to `filename` in `chunk_size` pieces so that at most one chunk
+    is held in memory. Redirects are followed by the same GET. When the
+    connection drops part way through, the download is resumed with a Range
+    request to the final URL from the last byte written. Returns the number of
+    bytes written.
+    """
+    written = 0
+    attempt = 0
+    start = time.perf_counter()
+    first_byte = None
+    with open(filename, "wb") as f:
+        while True:
+            headers = {"Range": f"bytes={written}-"} if written else {}
+            try:
+                with session.get(
+                    url, headers=headers, stream=True, timeout=TIMEOUT
+                ) as response:
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - start
+                        redirects = len(response.history)
+                    response.raise_for_status()
+                    url = response.url
+                    if written and response.status_code != 206:
+                        # Server ignored the Range header, start over
+                        f.seek(0)
+                        f.truncate()
+                        written = 0
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        written += len(chunk)
+                print(
+                    f"Downloaded {written} bytes in {time.perf_counter() - start:.2f}s "
+                    f"(first byte after {first_byte:.2f}s, {redirects} redirects)"
+                )
+                return written
+            except Exception as e:
+                attempt += 1
+                if not _is_retryable(e) or attempt > max_retries:
+                    raise
+                delay = backoff_factor * 2 ** (attempt - 1)
+                print(
+                    f"Download of {url} failed after {written} bytes ({e}), "
+                    f"retrying in {delay}s ({attempt}/{max_retries})"
+                )
+                time.sleep(delay)
@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+from rio_cogeo.profiles import cog_profiles
+
+
+# Creation option controlling the compression level of each codec
+LEVEL_OPTIONS = {
+    "DEFLATE": "zlevel",
+    "LERC_DEFLATE": "zlevel",
+    "ZSTD": "zstd_level",
+    "LERC_ZSTD": "zstd_level",
+    "LZMA": "lzma_preset",
+    "JPEG": "quality",
+    "WEBP": "quality",
+}
+
+
+def _option(config: Dict[str, str], key: str, cast):
+    value = config.get(key)
+    if value is None or value == "":
+        return None
+    return cast(value)
+
+
+@dataclass(frozen=True)
+class Encoding:
+    """
+    How a collection's COGs are encoded, read from its config section.
+
+    `dtype` casts the output (by default the variable's dtype is kept), and
+    `scale_factor` / `add_offset` pack values as
+    `stored = (value - add_offset) / scale_factor`, recording both in the COG so
+    readers can unpack them.
+    """
+
+    compress: str = "deflate"
+    level: Optional[int] = None
+    predictor: Optional[int] = None
+    max_z_error: Optional[float] = None
+    blocksize: int = 256
+    overview_resampling: str = "nearest"
+    overview_level: Optional[int] = None
+    dtype: Optional[str] = None
+    scale_factor: Optional[float] = None
+    add_offset: Optional[float] = None
+    nodata: Optional[float] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, str]) -> "Encoding":
+        options = dict(
+            compress=_option(config, "compress", str.lower),
+            level=_option(config, "level", int),
+            predictor=_option(config, "predictor", int),
+            max_z_error=_option(config, "max_z_error", float),
+            blocksize=_option(config, "blocksize", int),
+            overview_resampling=_option(config, "overview_resampling", str),
+            overview_level=_option(config, "overview_level", int),
+            dtype=_option(config, "dtype", str),
+            scale_factor=_option(config, "scale_factor", float),
+            add_offset=_option(config, "add_offset", float),
+            nodata=_option(config, "nodata", float),
+        )
+        encoding = cls(**{k: v for k, v in options.items() if v is not None})
+        # Fail on an unknown codec before any data is read
+        encoding.creation_options()
+        return encoding
+
+    @property
+    def packed(self) -> bool:
+        return self.scale_factor is not None or self.add_offset is not None
+
+    def creation_options(self) -> Dict:
+        try:
+            options = dict(cog_profiles.get(self.compress))
+        except KeyError:
+            raise ValueError(f"Unsupported COG compression {self.compress!r}")
+        options.update(blockxsize=self.blocksize, blockysize=self.blocksize)
+        if self.level is not None:
+            level_option = LEVEL_OPTIONS.get(options["compress"].upper(), "zlevel")
+            options[level_option] = self.level
+        if self.predictor is not None:
+            options["predictor"] = self.predictor
+        if self.max_z_error is not None:
+            options["max_z_error"] = self.max_z_error
+        return options
+
+    def output_dtype(self, dtype) -> np.dtype:
+        return np.dtype(self.dtype) if self.dtype else np.dtype(dtype)
+
+    def output_nodata(self, nodata, dtype):
+        """
+        Nodata value of the output, which must be representable in its dtype.
+        """
+        if self.nodata is not None:
+            return self.nodata
+        dtype = self.output_dtype(dtype)
+        if nodata is None or np.issubdtype(dtype, np.floating):
+            return nodata
+        info = np.iinfo(dtype)
+        if self.packed or not info.min <= nodata <= info.max:
+            return info.min
+        return nodata
+
+    def encode(self, data, nodata, dtype) -> np.ndarray:
+        """
+        Cast (and pack) an array to the output dtype, mapping masked and nodata
+        pixels to the output nodata value.
+        """
+        out_dtype = self.output_dtype(dtype)
+        out_nodata = self.output_nodata(nodata, dtype)
+        values = np.ma.getdata(data)
+        mask = np.ma.getmaskarray(data)
+        if nodata is not None:
+            mask = mask | (values == nodata)
+
+        if self.packed:
+            values = (values.astype(np.float64) - (self.add_offset or 0)) / (
+                self.scale_factor or 1
+            )
+        if np.issubdtype(out_dtype, np.integer) and not np.issubdtype(
+            values.dtype, np.integer
+        ):
+            info = np.iinfo(out_dtype)
+            values = np.clip(np.round(values), info.min, info.max)
+
+        encoded = values.astype(out_dtype)
+        if out_nodata is not None and mask.any():
+            encoded[mask] = out_nodata
+        return encoded
+
+    def tag(self, dst) -> None:
+        """
+        Record packing on an open dataset so readers can unpack values.
+        """
+        if self.packed:
+            dst.scales = [self.scale_factor or 1] * dst.count
+            dst.offsets = [self.add_offset or 0] * dst.count
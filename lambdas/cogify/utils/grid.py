@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from affine import Affine
+from rasterio.crs import CRS
+
+
+@dataclass(frozen=True)
+class GridProfile:
+    """
+    Georeferencing shared by every granule of a collection variable.
+    """
+
+    bounds: Tuple[float, float, float, float]
+    crs: CRS
+    transform: Affine
+
+    def to_dict(self) -> Dict:
+        return {
+            "bounds": [float(b) for b in self.bounds],
+            "crs": self.crs.to_wkt(),
+            "transform": list(self.transform.to_gdal()),
+        }
+
+    @classmethod
+    def from_dict(cls, obj: Dict) -> "GridProfile":
+        return cls(
+            bounds=tuple(obj["bounds"]),
+            crs=CRS.from_wkt(obj["crs"]),
+            transform=Affine.from_gdal(*obj["transform"]),
+        )
+
+
+# Settings of a collection section that change its georeferencing
+GRID_SETTINGS = ("src_crs", "affine_transformation", "x_variable", "y_variable")
+
+
+def grid_settings(config) -> Dict[str, Optional[str]]:
+    return {name: config.get(name) for name in GRID_SETTINGS}
+
+
+class GridProfileCache:
+    """
+    Grid profiles keyed by collection, variable, variable shape and the
+    section's georeferencing settings (so that editing them invalidates
+    persisted profiles), kept in process for warm containers and optionally
+    persisted as JSON sidecars in a local directory or under an
+    `s3://bucket/prefix` location.
+    """
+
+    def __init__(self, location: Optional[str] = None, s3_client=None):
+        self.location = location
+        self.s3_client = s3_client
+        self.profiles: Dict[str, GridProfile] = {}
+
+    @staticmethod
+    def key(
+        collection: str,
+        variable_name: str,
+        shape: Tuple[int, ...],
+        settings: Optional[Dict] = None,
+    ) -> str:
+        variable = variable_name.strip("/").replace("/", "_").replace(" ", "_")
+        key = f"{collection}_{variable}_{'x'.join(str(n) for n in shape)}"
+        if settings:
+            digest = hashlib.blake2b(
+                json.dumps(settings, sort_keys=True).encode(), digest_size=8
+            )
+            key += f"_{digest.hexdigest()}"
+        return key
+
+    def _sidecar_path(self, key: str) -> str:
+        return f"{self.location.rstrip('/')}/{key}.json"
+
+    def _read_sidecar(self, key: str) -> Optional[Dict]:
+        path = self._sidecar_path(key)
+        if path.startswith("s3://"):
+            bucket, _, s3_key = path[len("s3://") :].partition("/")
+            try:
+                response = self.s3_client.get_object(Bucket=bucket, Key=s3_key)
+            except self.s3_client.exceptions.NoSuchKey:
+                return None
+            return json.load(response["Body"])
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_sidecar(self, key: str, obj: Dict) -> None:
+        path = self._sidecar_path(key)
+        body = json.dumps(obj)
+        if path.startswith("s3://"):
+            bucket, _, s3_key = path[len("s3://") :].partition("/")
+            self.s3_client.put_object(Bucket=bucket, Key=s3_key, Body=body)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(body)
+
+    def get(
+        self,
+        collection: str,
+        variable_name: str,
+        shape: Tuple[int, ...],
+        settings: Optional[Dict] = None,
+    ) -> Optional[GridProfile]:
+        key = self.key(collection, variable_name, shape, settings)
+        if key in self.profiles:
+            return self.profiles[key]
+        if self.location and (obj := self._read_sidecar(key)):
+            self.profiles[key] = GridProfile.from_dict(obj)
+            return self.profiles[key]
+        return None
+
+    def put(
+        self,
+        collection: str,
+        variable_name: str,
+        shape: Tuple[int, ...],
+        profile: GridProfile,
+        settings: Optional[Dict] = None,
+    ) -> None:
+        key = self.key(collection, variable_name, shape, settings)
+        self.profiles[key] = profile
+        if self.location:
+            try:
+                self._write_sidecar(key, profile.to_dict())
+            except Exception as e:
+                print(f"Failed to persist grid profile {key}: {e}")
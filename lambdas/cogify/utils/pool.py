@@ -0,0 +1,69 @@
+import multiprocessing
+import os
+import traceback
+
+from multiprocessing.connection import wait
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _run(func: Callable[[Any], Any], item: Any, conn) -> None:
+    try:
+        conn.send((func(item), None))
+    except Exception as e:
+        traceback.print_exc()
+        conn.send((None, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def process_map(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: Optional[int] = None,
+) -> Iterator[Tuple[Any, Any, Optional[str]]]:
+    """
+    Run `func` over `items` in at most `max_workers` child processes, yielding
+    `(item, result, error)` tuples in completion order. A failing item yields its
+    error message rather than stopping the remaining items.
+
+    Built on `Process` and `Pipe` because AWS Lambda has no /dev/shm, which
+    `multiprocessing.Pool` and `ProcessPoolExecutor` both require.
+    """
+    max_workers = max_workers or available_cpus()
+    ctx = multiprocessing.get_context("fork")
+    items = iter(items)
+    running = {}
+
+    def start_next() -> bool:
+        try:
+            item = next(items)
+        except StopIteration:
+            return False
+        parent_conn, child_conn = ctx.Pipe(duplex=False)
+        process = ctx.Process(target=_run, args=(func, item, child_conn))
+        process.start()
+        child_conn.close()
+        running[parent_conn] = (process, item)
+        return True
+
+    while len(running) < max_workers and start_next():
+        pass
+
+    while running:
+        for conn in wait(list(running)):
+            process, item = running.pop(conn)
+            try:
+                result, error = conn.recv()
+            except EOFError:
+                result, error = None, "Worker process exited unexpectedly"
+            conn.close()
+            process.join()
+            yield item, result, error
+            start_next()
@@ -0,0 +1,68 @@
+import ast
+import functools
+import operator
+from typing import Callable, Dict, Tuple
+
+from affine import Affine
+
+
+SYMBOLS = ("xmin", "xmax", "ymin", "ymax", "xres", "yres")
+OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+Expression = Callable[[Dict[str, float]], float]
+
+
+class TransformSpecError(ValueError):
+    pass
+
+
+def _compile(node: ast.AST, spec: str) -> Expression:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        value = node.value
+        return lambda symbols: value
+    if isinstance(node, ast.Name):
+        if node.id not in SYMBOLS:
+            raise TransformSpecError(
+                f"Unknown symbol {node.id!r} in {spec!r}, expected one of {SYMBOLS}"
+            )
+        name = node.id
+        return lambda symbols: symbols[name]
+    if isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS:
+        op, operand = OPERATORS[type(node.op)], _compile(node.operand, spec)
+        return lambda symbols: op(operand(symbols))
+    if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+        op = OPERATORS[type(node.op)]
+        left, right = _compile(node.left, spec), _compile(node.right, spec)
+        return lambda symbols: op(left(symbols), right(symbols))
+    raise TransformSpecError(f"Unsupported expression {ast.dump(node)} in {spec!r}")
+
+
+@functools.lru_cache(maxsize=None)
+def compile_transform(spec: str) -> Callable[..., Affine]:
+    """
+    Compile a GDAL geotransform spec such as `(xmin, xres, 0, ymax, 0, -yres)`
+    into a callable taking the grid symbols as keyword arguments and returning
+    an `Affine`. Only numbers, the symbols in `SYMBOLS` and arithmetic
+    operators are allowed.
+    """
+    try:
+        tree = ast.parse(spec.strip(), mode="eval")
+    except SyntaxError as e:
+        raise TransformSpecError(f"Invalid transform spec {spec!r}: {e}") from e
+    if not isinstance(tree.body, ast.Tuple) or len(tree.body.elts) != 6:
+        raise TransformSpecError(f"Transform spec {spec!r} must be a 6-tuple")
+    terms: Tuple[Expression, ...] = tuple(
+        _compile(node, spec) for node in tree.body.elts
+    )
+
+    def transform(**symbols: float) -> Affine:
+        return Affine.from_gdal(*(term(symbols) for term in terms))
+
+    return transform
@@ -0,0 +1,110 @@
+import threading
+
+from functools import cached_property
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import rasterio
+
+from netCDF4 import Variable, default_fillvals
+from rasterio.windows import Window
+
+from .encoding import Encoding
+
+
+# HDF5 is not thread safe, so reads are serialized when outputs are encoded in
+# parallel threads. Reentrant, as jobs hold it while opening variables.
+read_lock = threading.RLock()
+
+
+class WindowedVariable:
+    """
+    Lazy view of a netCDF4 variable in output (row, column) orientation, read
+    one window at a time instead of loading the whole grid.
+
+    `time_index` selects one step of a (time, ...) variable. `transpose` swaps
+    the remaining axes, as done for GPM IMERG (time, lon, lat) grids. `flip`
+    reverses the rows, as done for OMI HDF-EOS grids stored south-up.
+    """
+
+    def __init__(
+        self,
+        variable: Variable,
+        time_index: Optional[int] = None,
+        transpose: bool = False,
+        flip: bool = False,
+    ):
+        self.variable = variable
+        self.time_index = time_index
+        self.transpose = transpose
+        self.flip = flip
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        shape = self.variable.shape
+        if self.time_index is not None:
+            shape = shape[1:]
+        if self.transpose:
+            return shape[1], shape[0]
+        return shape[0], shape[1]
+
+    @cached_property
+    def dtype(self) -> np.dtype:
+        """
+        dtype of the values `read` returns. netCDF4 unpacks scale_factor and
+        add_offset on read, so it is taken from a one-value read rather than
+        from the dtype stored on disk, as in the in-memory path.
+        """
+        index = (slice(0, 1),) * self.variable.ndim
+        with read_lock:
+            return self.variable[index].dtype
+
+    @property
+    def nodata(self):
+        fill_value = getattr(self.variable, "_FillValue", None)
+        if fill_value is None:
+            # netCDF default fill values are in the stored type
+            fill_value = default_fillvals.get(self.variable.dtype.str[1:])
+        return fill_value
+
+    def read(self, window: Window) -> np.ndarray:
+        (row_start, row_stop), (col_start, col_stop) = window.toranges()
+        if self.flip:
+            height = self.shape[0]
+            row_start, row_stop = height - row_stop, height - row_start
+
+        rows, cols = slice(row_start, row_stop), slice(col_start, col_stop)
+        index = (cols, rows) if self.transpose else (rows, cols)
+        if self.time_index is not None:
+            index = (self.time_index, *index)
+        with read_lock:
+            data = self.variable[index]
+
+        if self.transpose:
+            data = data.T
+        if self.flip:
+            data = data[::-1]
+        return np.ma.filled(data, self.nodata)
+
+
+def write_bands(
+    filename: str,
+    profile: dict,
+    variables: Sequence[WindowedVariable],
+    encoding: Encoding,
+    descriptions: Optional[Sequence[str]] = None,
+) -> None:
+    """
+    Copy variables into the bands of a tiled GeoTIFF, one block at a time, so
+    that peak memory is bounded by the block size rather than the grid size.
+    """
+    with rasterio.open(filename, "w", **profile) as dst:
+        encoding.tag(dst)
+        for band, variable in enumerate(variables, start=1):
+            if descriptions:
+                dst.set_band_description(band, descriptions[band - 1])
+            for _, window in dst.block_windows(band):
+                data = encoding.encode(
+                    variable.read(window), variable.nodata, variable.dtype
+                )
+                dst.write(data, band, window=window)
@@ -5,14 +5,7 @@ import tempfile
 import boto3
 from botocore.errorfactory import ClientError
 
-
-def assume_role(role_arn, session_name):
-    sts = boto3.client("sts")
-    creds = sts.assume_role(
-        RoleArn=role_arn,
-        RoleSessionName=session_name,
-    )
-    return creds["Credentials"]
+from utils.role import session_kwargs
 
 
 def handler(event, context):
@@ -20,12 +13,7 @@ def handler(event, context):
 
     kwargs = {}
     if role_arn := os.environ.get("EXTERNAL_ROLE_ARN"):
-        creds = assume_role(role_arn, "veda-data-pipelines_data-transfer")
-        kwargs = {
-            "aws_access_key_id": creds["AccessKeyId"],
-            "aws_secret_access_key": creds["SecretAccessKey"],
-            "aws_session_token": creds["SessionToken"],
-        }
+        kwargs = session_kwargs(role_arn, "veda-data-pipelines_data-transfer")
     source_s3 = boto3.client("s3")
     target_s3 = boto3.client("s3", **kwargs)
 
@@ -0,0 +1,108 @@
+import datetime as dt
+import threading
+from typing import Dict, Optional, Tuple
+
+import boto3
+
+# Credentials are assumed again, synchronously, once they are this close to
+# expiring
+REFRESH_MARGIN = dt.timedelta(minutes=5)
+# and refreshed in the background once they are this close
+BACKGROUND_REFRESH = dt.timedelta(minutes=15)
+
+
+class CredentialCache:
+    """
+    Assumed-role credentials by (role_arn, session_name), shared by every
+    invocation of a warm container so that STS is called once per role rather
+    than once per invocation, item or object.
+
+    Credentials within `background_refresh` of expiring are refreshed in a
+    thread while callers keep using them, and only credentials within
+    `refresh_margin` of expiring make callers wait for STS.
+    """
+
+    def __init__(
+        self,
+        refresh_margin: dt.timedelta = REFRESH_MARGIN,
+        background_refresh: dt.timedelta = BACKGROUND_REFRESH,
+    ):
+        self.refresh_margin = refresh_margin
+        self.background_refresh = background_refresh
+        self._credentials: Dict[Tuple[str, str], Dict] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        # Held while assuming a role synchronously, so that concurrent callers
+        # wait for one STS call instead of each making their own
+        self._assume_lock = threading.Lock()
+
+    def _assume(self, role_arn: str, session_name: str) -> Dict:
+        sts = boto3.client("sts")
+        creds = sts.assume_role(
+            RoleArn=role_arn,
+            RoleSessionName=session_name,
+        )["Credentials"]
+        with self._lock:
+            self._credentials[(role_arn, session_name)] = creds
+        return creds
+
+    def _refresh(self, role_arn: str, session_name: str) -> None:
+        try:
+            self._assume(role_arn, session_name)
+        except Exception as e:
+            # The next caller past the refresh margin assumes the role itself
+            print(f"Failed to refresh credentials of {role_arn}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard((role_arn, session_name))
+
+    def _valid(self, key: Tuple[str, str]) -> Optional[Dict]:
+        creds = self._credentials.get(key)
+        if creds is None:
+            return None
+        remaining = creds["Expiration"] - dt.datetime.now(dt.timezone.utc)
+        if remaining <= self.refresh_margin:
+            return None
+        if remaining <= self.background_refresh and key not in self._refreshing:
+            self._refreshing.add(key)
+            threading.Thread(target=self._refresh, args=key, daemon=True).start()
+        return creds
+
+    def get(self, role_arn: str, session_name: str) -> Dict:
+        """
+        Credentials of `role_arn`, as returned by STS.
+        """
+        key = (role_arn, session_name)
+        with self._lock:
+            creds = self._valid(key)
+        if creds:
+            return creds
+        with self._assume_lock:
+            with self._lock:
+                creds = self._valid(key)
+            return creds or self._assume(role_arn, session_name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._credentials.clear()
+
+
+# Shared by every invocation of a warm container
+credentials = CredentialCache()
+
+
+def assume_role(role_arn, session_name):
+    return credentials.get(role_arn, session_name)
+
+
+def session_kwargs(role_arn, session_name):
+    """
+    Keyword arguments for boto3 clients and rasterio's AWSSession using the
+    credentials of `role_arn`.
+    """
+    creds = assume_role(role_arn, session_name)
+    return {
+        "aws_access_key_id": creds["AccessKeyId"],
+        "aws_secret_access_key": creds["SecretAccessKey"],
+        "aws_session_token": creds["SessionToken"],
+    }
@@ -0,0 +1,45 @@
+import os
+
+import boto3
+import pytest
+from moto import mock_s3
+
+
+@pytest.fixture
+def aws_credentials():
+    """Mocked AWS Credentials for moto."""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    os.environ.pop("EXTERNAL_ROLE_ARN", None)
+
+
+@pytest.fixture
+def s3_client(aws_credentials):
+    with mock_s3():
+        yield boto3.client("s3", region_name="us-east-1")
+
+
+@pytest.fixture
+def src_bucket(s3_client):
+    """
+    Bucket with objects spread over several sub-prefixes, and one object
+    directly under the collection prefix.
+    """
+    s3_client.create_bucket(Bucket="src-bucket")
+    keys = ["collection/readme.txt"] + [
+        f"collection/{year}/file_{year}_{i:02d}.tif"
+        for year in range(2000, 2005)
+        for i in range(12)
+    ]
+    for key in keys:
+        s3_client.put_object(Bucket="src-bucket", Key=key, Body=b"")
+    yield "src-bucket"
+
+
+@pytest.fixture
+def manifest_bucket(s3_client):
+    s3_client.create_bucket(Bucket="manifest-bucket")
+    yield "manifest-bucket"
@@ -1,68 +1,162 @@
+import datetime as dt
+import json
 import os
-import re
+import uuid
 
 import boto3
 
+from utils.filters import KeyFilter
+from utils.inventory import (
+    inventory_fields,
+    iter_inventory,
+    read_inventory_manifest,
+)
+from utils.listing import iter_objects
+from utils.manifest import ManifestWriter
+from utils.role import session_kwargs
+from utils.state import DISCOVERY_STATE, DiscoveryState, StateStore
 
-def assume_role(role_arn, session_name):
-    sts = boto3.client("sts")
-    creds = sts.assume_role(
-        RoleArn=role_arn,
-        RoleSessionName=session_name,
-    )
-    return creds["Credentials"]
+# Step Functions limit on state payloads, in bytes
+MAX_PAYLOAD_SIZE = 256 * 1024
 
 
-def list_bucket(bucket, prefix, filename_regex):
+def s3_client():
     kwargs = {}
     if role_arn := os.environ.get("EXTERNAL_ROLE_ARN"):
-        creds = assume_role(role_arn, "veda-data-pipelines_s3-discovery")
-        kwargs = {
-            "aws_access_key_id": creds["AccessKeyId"],
-            "aws_secret_access_key": creds["SecretAccessKey"],
-            "aws_session_token": creds["SessionToken"],
-        }
-    s3 = boto3.resource("s3", **kwargs)
+        kwargs = session_kwargs(role_arn, "veda-data-pipelines_s3-discovery")
+    return boto3.client("s3", **kwargs)
+
+
+def list_bucket(s3, bucket, prefix, key_filter):
+    """
+    Lazily yield the objects under `prefix` whose keys are selected by
+    `key_filter`, listing only the narrowest prefixes its include patterns can
+    match.
+    """
     try:
-        files = []
-        bucket = s3.Bucket(bucket)
-        for obj in bucket.objects.filter(Prefix=prefix):
-            if filename_regex:
-                if re.match(filename_regex, obj.key):
-                    files.append(obj.key)
-            else:
-                files.append(obj.key)
-        return files
+        for list_prefix in key_filter.list_prefixes(prefix):
+            for obj in iter_objects(s3, bucket, list_prefix):
+                if key_filter(obj["Key"]):
+                    yield obj
 
     except:
         print("Failed during s3 item/asset discovery")
         raise
 
 
+def list_inventory(s3, manifest, prefix, key_filter):
+    """
+    Lazily yield the objects of an S3 Inventory under `prefix` whose keys are
+    selected by `key_filter`.
+    """
+    prefixes = tuple(key_filter.list_prefixes(prefix))
+
+    def select(key):
+        return key.startswith(prefixes) and key_filter(key)
+
+    try:
+        yield from iter_inventory(s3, manifest, select)
+    except:
+        print("Failed during s3 inventory discovery")
+        raise
+
+
+def only_new(objects, state: DiscoveryState):
+    """
+    Skip objects whose key and ETag were already emitted, recording the others
+    in `state`.
+    """
+    for obj in objects:
+        if "ETag" not in obj:
+            print(f"No ETag for {obj['Key']}, add ETag to the inventory's fields")
+            raise ValueError("Incremental discovery needs the ETag of every object")
+        if state.is_new(obj["Key"], obj["ETag"]):
+            state.add(obj["Key"], obj["ETag"])
+            yield obj
+
+
 def handler(event, context):
-    bucket = event.pop("bucket")
+    inventory = event.pop("inventory", None)
+    bucket = event.pop("bucket", None)
     prefix = event.pop("prefix", "")
+    filters = {
+        "filename_regex": event.pop("filename_regex", None),
+        "include": event.pop("include", None),
+        "exclude": event.pop("exclude", None),
+        "exclude_regex": event.pop("exclude_regex", None),
+    }
+    key_filter = KeyFilter(**filters)
+    cogify = event.pop("cogify", False)
+    manifest = event.pop("manifest", False)
+    manifest_bucket = event.pop("manifest_bucket", os.environ.get("MANIFEST_BUCKET"))
+    incremental = event.pop("incremental", False)
+    state_location = event.pop("state_location", DISCOVERY_STATE)
+    collection = event.get("collection", prefix.rstrip("/"))
 
-    filenames = list_bucket(
-        bucket=bucket, prefix=prefix, filename_regex=event.pop("filename_regex", None)
+    s3 = s3_client()
+    if inventory:
+        # Bulk read of an S3 Inventory instead of listing the bucket
+        inventory_manifest = read_inventory_manifest(s3, inventory)
+        bucket = bucket or inventory_manifest["sourceBucket"]
+        fields = inventory_fields(inventory_manifest)
+        if incremental and fields is not None and "ETag" not in fields:
+            print(f"S3 Inventory {inventory} has no ETag field, only {fields}")
+            raise ValueError("Incremental discovery needs the ETag inventory field")
+        objects = list_inventory(s3, inventory_manifest, prefix, key_filter)
+    else:
+        objects = list_bucket(s3, bucket, prefix, key_filter)
+    if incremental:
+        started = dt.datetime.utcnow().isoformat()
+        store = StateStore("s3", state_location, boto3.client("s3"))
+        # Discoveries of one collection from different buckets, prefixes or
+        # filters each have their own state
+        state_query = {"bucket": bucket, "prefix": prefix, **filters}
+        state = store.load(collection, state_query)
+        objects = only_new(objects, state)
+    files_objs = (
+        {
+            **event,
+            "collection": collection,
+            "s3_filename": f"s3://{bucket}/{obj['Key']}",
+            "upload": event.get("upload", False),
+        }
+        for obj in objects
     )
 
-    files_objs = []
-    cogify = event.pop("cogify", False)
-    collection = event.get("collection", prefix.rstrip("/"))
-    for filename in filenames:
-        files_objs.append(
-            {
-                **event,
-                "collection": collection,
-                "s3_filename": f"s3://{bucket}/{filename}",
-                "upload": event.get("upload", False),
-            }
-        )
-    return {
-        "cogify": cogify,
-        "objects": files_objs,
-    }
+    if not manifest:
+        response = {
+            "cogify": cogify,
+            "objects": list(files_objs),
+        }
+        if incremental and len(json.dumps(response).encode()) > MAX_PAYLOAD_SIZE:
+            # Saving the state would mark objects that are never delivered as
+            # discovered
+            print(
+                f"{len(response['objects'])} objects exceed the Step Functions "
+                "payload limit, use manifest mode"
+            )
+            raise ValueError("Incremental discovery response too large for a payload")
+    else:
+        # Large prefixes don't fit in a Step Functions payload, so the objects
+        # are written to NDJSON manifests and only pointers to them are returned
+        run_id = getattr(context, "aws_request_id", None) or uuid.uuid4().hex
+        with ManifestWriter(
+            boto3.client("s3"), manifest_bucket, f"discovery/{collection}/{run_id}"
+        ) as writer:
+            writer.write_all(files_objs)
+        response = {
+            "cogify": cogify,
+            "collection": collection,
+            "manifests": writer.manifests,
+            "count": writer.count,
+        }
+
+    if incremental:
+        # Only saved once every new object was emitted, so a failed run is
+        # retried in full
+        state.watermark = started
+        store.save(collection, state, state_query)
+    return response
 
 
 if __name__ == "__main__":
@@ -0,0 +1,103 @@
+from unittest.mock import patch
+
+import pytest
+
+import handler
+from utils import listing
+from utils.filters import KeyFilter, glob_literal_prefix, regex_literal_prefix
+
+
+@pytest.mark.parametrize(
+    "pattern,expected",
+    [
+        ("^(.*)2001(.*).tif$", ""),
+        ("^collection/2001/.*\\.tif$", "collection/2001/"),
+        ("collection/2001/file", "collection/2001/file"),
+        ("collection/file_\\d+", "collection/file_"),
+        ("collection\\/20+", "collection/20"),
+        ("collection/20?1", "collection/2"),
+        ("collection/200{1,2}", "collection/20"),
+        ("collection/200[12]", "collection/200"),
+        ("collection/2001|other/2001", ""),
+        ("(?i)collection/2001", ""),
+    ],
+)
+def test_regex_literal_prefix(pattern, expected):
+    assert regex_literal_prefix(pattern) == expected
+
+
+@pytest.mark.parametrize(
+    "pattern,expected",
+    [
+        ("collection/2001/*.tif", "collection/2001/"),
+        ("collection/200?/*", "collection/200"),
+        ("collection/200[12]/*", "collection/200"),
+        ("*.tif", ""),
+    ],
+)
+def test_glob_literal_prefix(pattern, expected):
+    assert glob_literal_prefix(pattern) == expected
+
+
+def test_key_filter():
+    """
+    Ensure a key must match an include pattern and no exclude pattern.
+    """
+    key_filter = KeyFilter(
+        filename_regex="^(.*)2001(.*).tif$",
+        include=["*/2002/*.tif"],
+        exclude="*_11.tif",
+        exclude_regex=".*_10",
+    )
+
+    assert key_filter("collection/2001/file_2001_00.tif")
+    assert key_filter("collection/2002/file_2002_00.tif")
+    assert not key_filter("collection/2003/file_2003_00.tif")
+    assert not key_filter("collection/2001/file_2001_10.tif")
+    assert not key_filter("collection/2002/file_2002_11.tif")
+    assert KeyFilter()("any/key")
+
+
+@pytest.mark.parametrize(
+    "prefix,includes,expected",
+    [
+        ("collection/", [], ["collection/"]),
+        ("collection/", ["*.tif"], ["collection/"]),
+        (
+            "",
+            ["collection/2001/*", "collection/2002/*"],
+            ["collection/2001/", "collection/2002/"],
+        ),
+        ("collection/", ["collection/2001/*", "collection/*"], ["collection/"]),
+        ("collection/2001/", ["collection/*"], ["collection/2001/"]),
+        ("collection/", ["other/*"], []),
+    ],
+)
+def test_list_prefixes(prefix, includes, expected):
+    assert KeyFilter(include=includes).list_prefixes(prefix) == expected
+
+
+def test_handler_lists_narrowed_prefixes(s3_client, src_bucket):
+    """
+    Ensure only the prefixes the patterns can match are listed.
+    """
+    listed = []
+    list_page = listing.list_page
+
+    def spy(s3, bucket, prefix, *args, **kwargs):
+        listed.append(prefix)
+        return list_page(s3, bucket, prefix, *args, **kwargs)
+
+    with patch.object(listing, "list_page", spy):
+        response = handler.handler(
+            {
+                "bucket": src_bucket,
+                "prefix": "collection/",
+                "filename_regex": ["^collection/2001/.*", "^collection/2003/.*"],
+                "exclude": "*_0?.tif",
+            },
+            None,
+        )
+
+    assert set(listed) == {"collection/2001/", "collection/2003/"}
+    assert len(response["objects"]) == 4
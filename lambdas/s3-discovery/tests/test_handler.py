@@ -0,0 +1,52 @@
+from unittest.mock import patch
+
+import handler
+from utils import manifest
+
+
+def test_handler(src_bucket):
+    response = handler.handler(
+        {
+            "bucket": src_bucket,
+            "prefix": "collection/",
+            "filename_regex": "^(.*).tif$",
+            "upload": True,
+        },
+        None,
+    )
+
+    assert response["cogify"] is False
+    assert len(response["objects"]) == 60
+    assert response["objects"][0]["collection"] == "collection"
+    assert response["objects"][0]["upload"] is True
+
+
+def test_handler_manifest(s3_client, src_bucket, manifest_bucket):
+    """
+    Ensure manifest mode returns only pointers and counts, and the manifests
+    hold the same objects as a regular run.
+    """
+    event = {
+        "bucket": src_bucket,
+        "prefix": "collection/",
+        "filename_regex": "^(.*).tif$",
+        "collection": "test-collection",
+    }
+    expected = handler.handler(dict(event), None)["objects"]
+
+    with patch.object(manifest, "MANIFEST_PAGE_SIZE", 25):
+        response = handler.handler(
+            {**event, "manifest": True, "manifest_bucket": manifest_bucket}, None
+        )
+
+    assert "objects" not in response
+    assert response["count"] == 60
+    assert [m["count"] for m in response["manifests"]] == [25, 25, 10]
+    objects = [
+        obj
+        for m in response["manifests"]
+        for obj in manifest.read_manifest(s3_client, m["manifest"])
+    ]
+    assert sorted(objects, key=lambda o: o["s3_filename"]) == sorted(
+        expected, key=lambda o: o["s3_filename"]
+    )
@@ -0,0 +1,213 @@
+import gzip
+import json
+
+import pytest
+
+import handler
+from utils.inventory import inventory_fields
+
+SCHEMA = "Bucket, Key, Size, LastModifiedDate, ETag"
+
+
+@pytest.fixture
+def inventory(s3_client, src_bucket):
+    """
+    CSV S3 Inventory of the source bucket, split over two data files.
+    """
+    s3_client.create_bucket(Bucket="inventory-bucket")
+    objects = [
+        obj
+        for page in s3_client.get_paginator("list_objects_v2").paginate(
+            Bucket=src_bucket
+        )
+        for obj in page["Contents"]
+    ]
+    objects.append({"Key": "other/file 2000.tif", "Size": 0, "ETag": '"x"'})
+
+    files = []
+    for i, chunk in enumerate([objects[:30], objects[30:]]):
+        rows = "".join(
+            f'"{src_bucket}","{obj["Key"].replace(" ", "+")}","{obj["Size"]}",'
+            f'"2022-01-01T00:00:00.000Z","{obj["ETag"].strip(chr(34))}"\n'
+            for obj in chunk
+        )
+        key = f"{src_bucket}/inventory/data/{i}.csv.gz"
+        s3_client.put_object(
+            Bucket="inventory-bucket", Key=key, Body=gzip.compress(rows.encode())
+        )
+        files.append({"key": key})
+
+    manifest = {
+        "sourceBucket": src_bucket,
+        "destinationBucket": "arn:aws:s3:::inventory-bucket",
+        "fileFormat": "CSV",
+        "fileSchema": SCHEMA,
+        "files": files,
+    }
+    s3_client.put_object(
+        Bucket="inventory-bucket",
+        Key=f"{src_bucket}/inventory/manifest.json",
+        Body=json.dumps(manifest),
+    )
+    yield f"s3://inventory-bucket/{src_bucket}/inventory/manifest.json"
+
+
+def test_inventory_matches_listing(src_bucket, inventory):
+    """
+    Ensure an inventory is filtered like a listing and gives the same objects.
+    """
+    event = {
+        "prefix": "collection/",
+        "filename_regex": "^collection/200[12]/.*",
+        "exclude": "*_11.tif",
+    }
+
+    expected = handler.handler({**event, "bucket": src_bucket}, None)["objects"]
+    response = handler.handler({**event, "inventory": inventory}, None)
+
+    assert len(response["objects"]) == 22
+    assert sorted(response["objects"], key=lambda o: o["s3_filename"]) == sorted(
+        expected, key=lambda o: o["s3_filename"]
+    )
+
+
+def test_inventory_decodes_keys(src_bucket, inventory):
+    response = handler.handler({"prefix": "other/", "inventory": inventory}, None)
+
+    assert [o["s3_filename"] for o in response["objects"]] == [
+        f"s3://{src_bucket}/other/file 2000.tif"
+    ]
+
+
+def test_inventory_incremental(s3_client, src_bucket, inventory, tmp_path):
+    """
+    Ensure inventory ETags are recorded like listed ones, so the two sources
+    can be mixed in incremental runs.
+    """
+    event = {
+        "prefix": "collection/",
+        "incremental": True,
+        "state_location": str(tmp_path),
+    }
+
+    assert (
+        len(handler.handler({**event, "inventory": inventory}, None)["objects"]) == 61
+    )
+    assert handler.handler({**event, "bucket": src_bucket}, None)["objects"] == []
+
+
+def test_parquet_inventory(s3_client, src_bucket, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    s3_client.create_bucket(Bucket="inventory-bucket")
+    table = pa.table(
+        {
+            "bucket": [src_bucket] * 2,
+            "key": ["collection/2000/a.tif", "collection/2001/b.tif"],
+            "size": [1, 2],
+            "e_tag": ["etag-a", "etag-b"],
+        }
+    )
+    pq.write_table(table, tmp_path / "data.parquet")
+    s3_client.upload_file(
+        str(tmp_path / "data.parquet"), "inventory-bucket", "inventory/data.parquet"
+    )
+    manifest = {
+        "sourceBucket": src_bucket,
+        "destinationBucket": "arn:aws:s3:::inventory-bucket",
+        "fileFormat": "Parquet",
+        "fileSchema": "message s3.inventory { ... }",
+        "files": [{"key": "inventory/data.parquet"}],
+    }
+    s3_client.put_object(
+        Bucket="inventory-bucket",
+        Key="inventory/manifest.json",
+        Body=json.dumps(manifest),
+    )
+
+    response = handler.handler(
+        {
+            "inventory": "s3://inventory-bucket/inventory/manifest.json",
+            "include": "collection/2001/*",
+        },
+        None,
+    )
+
+    assert [o["s3_filename"] for o in response["objects"]] == [
+        f"s3://{src_bucket}/collection/2001/b.tif"
+    ]
+
+
+def write_inventory(s3_client, src_bucket, schema, rows):
+    s3_client.create_bucket(Bucket="inventory-bucket")
+    s3_client.put_object(
+        Bucket="inventory-bucket",
+        Key="inventory/data.csv.gz",
+        Body=gzip.compress("".join(rows).encode()),
+    )
+    manifest = {
+        "sourceBucket": src_bucket,
+        "destinationBucket": "arn:aws:s3:::inventory-bucket",
+        "fileFormat": "CSV",
+        "fileSchema": schema,
+        "files": [{"key": "inventory/data.csv.gz"}],
+    }
+    s3_client.put_object(
+        Bucket="inventory-bucket",
+        Key="inventory/manifest.json",
+        Body=json.dumps(manifest),
+    )
+    return "s3://inventory-bucket/inventory/manifest.json"
+
+
+def test_versioned_inventory(s3_client, src_bucket):
+    """
+    Ensure non-current versions and delete markers are skipped.
+    """
+    inventory = write_inventory(
+        s3_client,
+        src_bucket,
+        "Bucket, Key, VersionId, IsLatest, IsDeleteMarker, Size, ETag",
+        [
+            f'"{src_bucket}","current.tif","v2","true","false","1","a"\n',
+            f'"{src_bucket}","current.tif","v1","false","false","1","b"\n',
+            f'"{src_bucket}","deleted.tif","v2","true","true","",""\n',
+            f'"{src_bucket}","deleted.tif","v1","false","false","1","c"\n',
+        ],
+    )
+
+    response = handler.handler({"inventory": inventory}, None)
+
+    assert [o["s3_filename"] for o in response["objects"]] == [
+        f"s3://{src_bucket}/current.tif"
+    ]
+
+
+def test_incremental_inventory_without_etag(s3_client, src_bucket, tmp_path):
+    inventory = write_inventory(
+        s3_client, src_bucket, "Bucket, Key, Size", [f'"{src_bucket}","a.tif","1"\n']
+    )
+    event = {"inventory": inventory, "state_location": str(tmp_path)}
+
+    assert len(handler.handler(dict(event), None)["objects"]) == 1
+    with pytest.raises(ValueError, match="ETag"):
+        handler.handler({**event, "incremental": True}, None)
+
+
+def test_inventory_fields():
+    parquet = {
+        "fileFormat": "Parquet",
+        "fileSchema": "message s3.inventory { required binary bucket (STRING); "
+        "required binary key (STRING); optional int64 size; "
+        "optional boolean is_latest; }",
+    }
+
+    assert inventory_fields(parquet) == {"Key", "Size", "IsLatest"}
+    assert inventory_fields({**parquet, "fileSchema": "..."}) is None
+    assert inventory_fields({"fileFormat": "CSV", "fileSchema": SCHEMA}) == {
+        "Key",
+        "Size",
+        "LastModified",
+        "ETag",
+    }
@@ -0,0 +1,43 @@
+import pytest
+
+from utils.listing import iter_objects
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_iter_objects(s3_client, src_bucket, max_workers):
+    """
+    Ensure every object is listed once, across sub-prefixes and pages.
+    """
+    expected = [
+        obj["Key"]
+        for page in s3_client.get_paginator("list_objects_v2").paginate(
+            Bucket=src_bucket, Prefix="collection/"
+        )
+        for obj in page["Contents"]
+    ]
+
+    keys = [
+        obj["Key"]
+        for obj in iter_objects(
+            s3_client, src_bucket, "collection/", max_workers=max_workers
+        )
+    ]
+
+    assert sorted(keys) == sorted(expected)
+    assert len(keys) == 61
+
+
+def test_iter_objects_pages(s3_client, src_bucket, monkeypatch):
+    """
+    Ensure truncated listings are followed with continuation tokens.
+    """
+    list_objects_v2 = s3_client.list_objects_v2
+    monkeypatch.setattr(
+        s3_client,
+        "list_objects_v2",
+        lambda **kwargs: list_objects_v2(MaxKeys=5, **kwargs),
+    )
+
+    keys = [obj["Key"] for obj in iter_objects(s3_client, src_bucket, "collection/")]
+
+    assert len(keys) == len(set(keys)) == 61
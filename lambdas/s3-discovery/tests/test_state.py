@@ -0,0 +1,104 @@
+from unittest.mock import patch
+
+import pytest
+
+import handler
+from utils.state import DiscoveryState, StateStore
+
+
+def test_state_roundtrip(tmp_path):
+    state = DiscoveryState(watermark="2022-01-01T00:00:00")
+    state.add("collection/a.tif", '"etag-a"')
+    store = StateStore("s3", str(tmp_path))
+
+    store.save("collection", state)
+    loaded = store.load("collection")
+
+    assert loaded == state
+    assert not loaded.is_new("collection/a.tif", '"etag-a"')
+    assert loaded.is_new("collection/a.tif", '"etag-b"')
+    assert StateStore("s3", str(tmp_path)).load("other") == DiscoveryState()
+
+
+def test_incremental(s3_client, src_bucket, tmp_path):
+    """
+    Ensure reruns only emit new or overwritten objects.
+    """
+    event = {
+        "bucket": src_bucket,
+        "prefix": "collection/",
+        "filename_regex": "^(.*).tif$",
+        "incremental": True,
+        "state_location": str(tmp_path),
+    }
+
+    assert len(handler.handler(dict(event), None)["objects"]) == 60
+    assert handler.handler(dict(event), None)["objects"] == []
+
+    s3_client.put_object(
+        Bucket=src_bucket, Key="collection/2000/file_2000_00.tif", Body=b"new"
+    )
+    s3_client.put_object(
+        Bucket=src_bucket, Key="collection/2005/file_2005_00.tif", Body=b""
+    )
+    response = handler.handler(dict(event), None)
+
+    assert sorted(o["s3_filename"] for o in response["objects"]) == [
+        f"s3://{src_bucket}/collection/2000/file_2000_00.tif",
+        f"s3://{src_bucket}/collection/2005/file_2005_00.tif",
+    ]
+
+
+def test_incremental_s3_state(s3_client, src_bucket):
+    s3_client.create_bucket(Bucket="state-bucket")
+    event = {
+        "bucket": src_bucket,
+        "prefix": "collection/",
+        "incremental": True,
+        "state_location": "s3://state-bucket/discovery",
+    }
+
+    assert len(handler.handler(dict(event), None)["objects"]) == 61
+    assert handler.handler(dict(event), None)["objects"] == []
+    state_files = s3_client.list_objects_v2(Bucket="state-bucket")["Contents"]
+    assert len(state_files) == 1
+    assert state_files[0]["Key"].startswith("discovery/s3-collection-")
+
+
+def test_incremental_state_per_query(s3_client, src_bucket, tmp_path):
+    """
+    Ensure discoveries of one collection with different parameters don't
+    share their state.
+    """
+    event = {
+        "bucket": src_bucket,
+        "prefix": "collection/2000/",
+        "collection": "collection",
+        "incremental": True,
+        "state_location": str(tmp_path),
+    }
+
+    first = handler.handler(dict(event), None)["objects"]
+    wider = handler.handler({**event, "prefix": "collection/"}, None)["objects"]
+
+    assert len(wider) > len(first) > 0
+    assert handler.handler(dict(event), None)["objects"] == []
+
+
+def test_incremental_payload_too_large(s3_client, src_bucket, tmp_path):
+    """
+    Ensure objects aren't marked as discovered when they can't be returned.
+    """
+    event = {
+        "bucket": src_bucket,
+        "prefix": "collection/",
+        "incremental": True,
+        "state_location": str(tmp_path),
+    }
+
+    with patch.object(handler, "MAX_PAYLOAD_SIZE", 100):
+        with pytest.raises(ValueError):
+            handler.handler(dict(event), None)
+
+    assert list(tmp_path.iterdir()) == []
+    assert len(handler.handler(dict(event), None)["objects"]) == 61
@@ -0,0 +1,118 @@
+import fnmatch
+import re
+from typing import List, Optional, Sequence, Union
+
+Patterns = Optional[Union[str, Sequence[str]]]
+
+# Characters that end the literal part of a regex
+REGEX_SPECIAL = set(".^$*+?{}[]|()")
+# Quantifiers that make the preceding character optional or repeated
+REGEX_QUANTIFIERS = set("*?{")
+GLOB_SPECIAL = set("*?[")
+
+
+def _as_list(patterns: Patterns) -> List[str]:
+    if not patterns:
+        return []
+    if isinstance(patterns, str):
+        return [patterns]
+    return list(patterns)
+
+
+def regex_literal_prefix(pattern: str) -> str:
+    """
+    Longest literal string every match of `pattern` (with `re.match`) starts
+    with, e.g. "delta/no2/.*\\.tif$" -> "delta/no2/".
+    """
+    if "|" in pattern or pattern.startswith("(?"):
+        # Alternations and inline flags (e.g. case insensitivity) can match
+        # keys that don't share a literal prefix
+        return ""
+    pattern = pattern[1:] if pattern.startswith("^") else pattern
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            escaped = pattern[i + 1 : i + 2]
+            if not escaped or escaped.isalnum():
+                # Character classes such as \d, \w, \s
+                break
+            char, i = escaped, i + 2
+        elif char in REGEX_SPECIAL:
+            break
+        else:
+            i += 1
+        if pattern[i : i + 1] in REGEX_QUANTIFIERS:
+            # The last character may not be there at all
+            break
+        if pattern[i : i + 1] == "+":
+            prefix.append(char)
+            break
+        prefix.append(char)
+    return "".join(prefix)
+
+
+def glob_literal_prefix(pattern: str) -> str:
+    """
+    Literal part of a glob before its first wildcard.
+    """
+    for i, char in enumerate(pattern):
+        if char in GLOB_SPECIAL:
+            return pattern[:i]
+    return pattern
+
+
+class KeyFilter:
+    """
+    Selects keys that match any include pattern (or every key when there is
+    none) and no exclude pattern. Regexes are matched with `re.match` against
+    the whole key, globs with `fnmatch` semantics, where `*` also matches `/`.
+    Every pattern is compiled once.
+    """
+
+    def __init__(
+        self,
+        filename_regex: Patterns = None,
+        include: Patterns = None,
+        exclude: Patterns = None,
+        exclude_regex: Patterns = None,
+    ):
+        include_regexes = _as_list(filename_regex)
+        include_globs = _as_list(include)
+        self.includes = [re.compile(p) for p in include_regexes] + [
+            re.compile(fnmatch.translate(p)) for p in include_globs
+        ]
+        self.excludes = [re.compile(p) for p in _as_list(exclude_regex)] + [
+            re.compile(fnmatch.translate(p)) for p in _as_list(exclude)
+        ]
+        self.include_prefixes = [regex_literal_prefix(p) for p in include_regexes] + [
+            glob_literal_prefix(p) for p in include_globs
+        ]
+
+    def __call__(self, key: str) -> bool:
+        if self.includes and not any(p.match(key) for p in self.includes):
+            return False
+        return not any(p.match(key) for p in self.excludes)
+
+    def list_prefixes(self, prefix: str = "") -> List[str]:
+        """
+        Narrowest set of prefixes to list under `prefix` so that every key that
+        can match is listed, e.g. "" with includes "a/b/.*" and "a/c/*" lists
+        "a/b/" and "a/c/" instead of the whole bucket.
+        """
+        if not self.include_prefixes:
+            return [prefix]
+        narrowed = set()
+        for include_prefix in self.include_prefixes:
+            if include_prefix.startswith(prefix):
+                narrowed.add(include_prefix)
+            elif prefix.startswith(include_prefix):
+                narrowed.add(prefix)
+            # Otherwise no key under `prefix` can match this pattern
+        # Drop prefixes already covered by a shorter one
+        return [
+            p
+            for p in sorted(narrowed)
+            if not any(p != other and p.startswith(other) for other in narrowed)
+        ]
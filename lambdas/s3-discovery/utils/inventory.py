@@ -0,0 +1,170 @@
+import csv
+import gzip
+import io
+import json
+import re
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set
+from urllib.parse import unquote_plus, urlparse
+
+from .listing import LIST_CONCURRENCY
+
+# Inventory fields -> keys of the objects returned by ListObjectsV2, so that
+# inventory rows flow through the same filters as a listing
+FIELDS = {
+    "key": "Key",
+    "size": "Size",
+    "lastmodifieddate": "LastModified",
+    "etag": "ETag",
+    # Versioned buckets only, rows of deleted and non-current versions are
+    # skipped
+    "islatest": "IsLatest",
+    "isdeletemarker": "IsDeleteMarker",
+}
+VERSION_FIELDS = ("IsLatest", "IsDeleteMarker")
+
+
+def _field_name(name: str) -> str:
+    # CSV schemas use "LastModifiedDate", Parquet columns "last_modified_date"
+    return name.strip().replace("_", "").lower()
+
+
+def _flag(value) -> bool:
+    # "true"/"false" in CSV inventories, booleans in Parquet ones
+    if isinstance(value, str):
+        return value.strip().lower() == "true"
+    return bool(value)
+
+
+def is_current(obj: dict) -> bool:
+    """
+    Whether a row is the current version of an object, dropping the version
+    fields from it.
+    """
+    is_latest = obj.pop("IsLatest", None)
+    is_delete_marker = obj.pop("IsDeleteMarker", None)
+    if is_latest is not None and not _flag(is_latest):
+        return False
+    return not (is_delete_marker is not None and _flag(is_delete_marker))
+
+
+def inventory_fields(manifest: dict) -> Optional[Set[str]]:
+    """
+    Fields of the objects read from an inventory, or None when its schema
+    can't be read.
+    """
+    schema = manifest.get("fileSchema", "")
+    if manifest["fileFormat"] == "CSV":
+        names = schema.split(",")
+    else:
+        # e.g. "message s3.inventory { required binary key (STRING); ... }"
+        names = re.findall(r"(\w+)\s*(?:\([^)]*\))?\s*;", schema)
+    fields = {FIELDS[_field_name(n)] for n in names if _field_name(n) in FIELDS}
+    return fields or None
+
+
+def read_inventory_manifest(s3, url: str) -> dict:
+    parsed = urlparse(url)
+    response = s3.get_object(Bucket=parsed.netloc, Key=parsed.path.lstrip("/"))
+    return json.load(response["Body"])
+
+
+def _read_csv(s3, bucket: str, key: str, schema: Sequence[str]) -> Iterator[dict]:
+    columns = [FIELDS.get(_field_name(name)) for name in schema]
+    body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+    with io.TextIOWrapper(gzip.GzipFile(fileobj=body), encoding="utf-8") as f:
+        for row in csv.reader(f):
+            obj = {column: value for column, value in zip(columns, row) if column}
+            # Inventory keys are URL encoded
+            obj["Key"] = unquote_plus(obj["Key"])
+            if "ETag" in obj:
+                obj["ETag"] = f'"{obj["ETag"]}"'
+            yield obj
+
+
+def _read_parquet(s3, bucket: str, key: str, schema: Sequence[str]) -> Iterator[dict]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("pyarrow is required to read Parquet inventories")
+
+    # Parquet needs random access, so the file is spooled to /tmp
+    with tempfile.TemporaryFile() as f:
+        s3.download_fileobj(bucket, key, f)
+        parquet_file = pq.ParquetFile(f)
+        names = {
+            FIELDS[_field_name(name)]: name
+            for name in parquet_file.schema_arrow.names
+            if _field_name(name) in FIELDS
+        }
+        for batch in parquet_file.iter_batches(columns=list(names.values())):
+            columns = {
+                field: batch.column(name).to_pylist() for field, name in names.items()
+            }
+            for values in zip(*columns.values()):
+                obj = dict(zip(columns, values))
+                if "ETag" in obj:
+                    obj["ETag"] = f'"{obj["ETag"]}"'
+                yield obj
+
+
+READERS = {"CSV": _read_csv, "Parquet": _read_parquet}
+
+
+def read_inventory_file(
+    s3,
+    bucket: str,
+    key: str,
+    file_format: str,
+    schema: Sequence[str],
+    select: Callable[[str], bool],
+) -> List[dict]:
+    """
+    The objects of one inventory data file whose keys are selected.
+    """
+    objects = READERS[file_format](s3, bucket, key, schema)
+    return [obj for obj in objects if is_current(obj) and select(obj["Key"])]
+
+
+def iter_inventory(
+    s3,
+    manifest: dict,
+    select: Callable[[str], bool] = lambda key: True,
+    max_workers: int = LIST_CONCURRENCY,
+) -> Iterator[Dict]:
+    """
+    Lazily yield the objects listed by an S3 Inventory manifest (see
+    `read_inventory_manifest`) whose keys are selected by `select`.
+
+    Data files are read in parallel, at most `max_workers` at a time, and
+    filtered as they are parsed so that only selected objects are held in
+    memory.
+    """
+    file_format = manifest["fileFormat"]
+    if file_format not in READERS:
+        raise ValueError(f"Unsupported S3 Inventory format {file_format}")
+    schema = manifest.get("fileSchema", "")
+    if file_format == "CSV":
+        schema = schema.split(",")
+    # destinationBucket is an ARN
+    bucket = manifest["destinationBucket"].split(":")[-1]
+
+    pending = deque(f["key"] for f in manifest["files"])
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or in_flight:
+            while pending and len(in_flight) < max_workers:
+                in_flight.append(
+                    executor.submit(
+                        read_inventory_file,
+                        s3,
+                        bucket,
+                        pending.popleft(),
+                        file_format,
+                        schema,
+                        select,
+                    )
+                )
+            yield from in_flight.popleft().result()
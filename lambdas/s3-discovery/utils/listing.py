@@ -0,0 +1,67 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+LIST_CONCURRENCY = int(os.environ.get("LIST_CONCURRENCY", 16))
+
+
+def list_page(
+    s3, bucket: str, prefix: str, token: Optional[str] = None, delimiter: str = ""
+) -> Tuple[List[dict], List[str], Optional[str]]:
+    """
+    One ListObjectsV2 call. Returns the objects, the common prefixes (when a
+    delimiter is given) and the continuation token of the next page, if any.
+    """
+    kwargs = {"Bucket": bucket, "Prefix": prefix}
+    if token:
+        kwargs["ContinuationToken"] = token
+    if delimiter:
+        kwargs["Delimiter"] = delimiter
+    response = s3.list_objects_v2(**kwargs)
+    prefixes = [p["Prefix"] for p in response.get("CommonPrefixes", [])]
+    next_token = (
+        response.get("NextContinuationToken") if response["IsTruncated"] else None
+    )
+    return response.get("Contents", []), prefixes, next_token
+
+
+def iter_objects(
+    s3,
+    bucket: str,
+    prefix: str = "",
+    delimiter: str = "/",
+    max_workers: int = LIST_CONCURRENCY,
+) -> Iterator[dict]:
+    """
+    Lazily list every object under `prefix`.
+
+    The level right below `prefix` is listed first with `delimiter`, then the
+    sub-prefixes it finds are listed in parallel, one page per task. At most
+    `max_workers` pages are in flight, so memory stays bounded however large
+    the prefix is, and objects are yielded as soon as their page arrives.
+    """
+    sub_prefixes = []
+    token = None
+    while True:
+        objects, prefixes, token = list_page(s3, bucket, prefix, token, delimiter)
+        yield from objects
+        sub_prefixes.extend(prefixes)
+        if not token:
+            break
+
+    # (sub-prefix, continuation token) of the pages still to list
+    pending = deque((sub_prefix, None) for sub_prefix in sub_prefixes)
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or in_flight:
+            while pending and len(in_flight) < max_workers:
+                sub_prefix, token = pending.popleft()
+                future = executor.submit(list_page, s3, bucket, sub_prefix, token)
+                in_flight.append((sub_prefix, future))
+            sub_prefix, future = in_flight.popleft()
+            objects, _, token = future.result()
+            if token:
+                # Next page first, so a sub-prefix is finished before starting more
+                pending.appendleft((sub_prefix, token))
+            yield from objects
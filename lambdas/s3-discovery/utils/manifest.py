@@ -0,0 +1,68 @@
+import json
+import os
+from typing import Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+MANIFEST_PAGE_SIZE = int(os.environ.get("MANIFEST_PAGE_SIZE", 10000))
+
+
+class ManifestWriter:
+    """
+    Write discovered objects to S3 as NDJSON pages of `page_size` lines,
+    `<prefix>/page-00000.ndjson`, `<prefix>/page-00001.ndjson`, ... Only the
+    current page is held in memory.
+    """
+
+    def __init__(self, s3, bucket: str, prefix: str, page_size: Optional[int] = None):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/")
+        self.page_size = page_size or MANIFEST_PAGE_SIZE
+        self.manifests: List[dict] = []
+        self._lines: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return sum(manifest["count"] for manifest in self.manifests) + len(self._lines)
+
+    def write(self, obj: dict) -> None:
+        self._lines.append(json.dumps(obj))
+        if len(self._lines) >= self.page_size:
+            self.flush()
+
+    def write_all(self, objs: Iterable[dict]) -> None:
+        for obj in objs:
+            self.write(obj)
+
+    def flush(self) -> None:
+        if not self._lines:
+            return
+        key = f"{self.prefix}/page-{len(self.manifests):05d}.ndjson"
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body="\n".join(self._lines).encode(),
+            ContentType="application/x-ndjson",
+        )
+        self.manifests.append(
+            {"manifest": f"s3://{self.bucket}/{key}", "count": len(self._lines)}
+        )
+        self._lines = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.flush()
+
+
+def read_manifest(s3, url: str) -> Iterator[dict]:
+    """
+    Stream the objects of one manifest page.
+    """
+    parsed = urlparse(url)
+    body = s3.get_object(Bucket=parsed.netloc, Key=parsed.path.lstrip("/"))["Body"]
+    for line in body.iter_lines():
+        if line:
+            yield json.loads(line)